@@ -0,0 +1,315 @@
+"""HTML for the admin views.
+
+Registered on the app's Jinja environment under the names in TEMPLATES and
+compiled once at startup, so requests only render, never parse.
+"""
+
+# Professional Tailwind CSS Dashboard Template
+INBOX = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>AIMatrix | Command Center</title>
+    <script src="https://cdn.tailwindcss.com"></script>
+    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
+    <style>
+        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
+        body { font-family: 'Inter', sans-serif; background-color: #f3f4f6; }
+        .glass { background: rgba(255, 255, 255, 0.95); backdrop-filter: blur(10px); }
+    </style>
+</head>
+<body>
+    <div class="flex h-screen overflow-hidden">
+        <aside class="w-64 bg-slate-900 text-white hidden md:flex flex-col">
+            <div class="p-6 text-center border-b border-slate-800">
+                <h1 class="text-2xl font-bold bg-clip-text text-transparent bg-gradient-to-r from-pink-500 to-violet-500">AIMatrix</h1>
+                <p class="text-xs text-slate-400 mt-1">ADMIN CONSOLE</p>
+            </div>
+            <nav class="flex-1 p-4 space-y-2">
+                <a href="#" class="flex items-center gap-3 px-4 py-3 bg-slate-800 rounded-lg text-blue-400 font-medium">
+                    <i class="fas fa-inbox w-5"></i> Inbox
+                </a>
+                <a href="/" target="_blank" class="flex items-center gap-3 px-4 py-3 text-slate-400 hover:bg-slate-800 hover:text-white rounded-lg transition">
+                    <i class="fas fa-external-link-alt w-5"></i> Live Site
+                </a>
+            </nav>
+            <div class="p-4 border-t border-slate-800">
+                <div class="flex items-center gap-3">
+                    <div class="w-8 h-8 rounded-full bg-gradient-to-tr from-pink-500 to-violet-500 flex items-center justify-center font-bold">A</div>
+                    <div class="text-sm">
+                        <p class="font-medium">Administrator</p>
+                        <p class="text-xs text-slate-500">Super User</p>
+                    </div>
+                </div>
+            </div>
+        </aside>
+
+        <main class="flex-1 flex flex-col overflow-hidden">
+            <header class="bg-white border-b border-gray-200 p-6 flex justify-between items-center">
+                <h2 class="text-2xl font-bold text-gray-800">Messages Inbox</h2>
+                <div class="flex gap-4">
+                    <form method="GET" action="/admin">
+                        <input type="text" name="q" id="searchInput" value="{{ q or '' }}" placeholder="Search messages..." class="px-4 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 w-64 text-sm">
+                    </form>
+                    <button onclick="window.location.reload()" class="p-2 text-gray-500 hover:text-blue-600 transition"><i class="fas fa-sync-alt"></i></button>
+                </div>
+            </header>
+
+            <div class="p-6 grid grid-cols-1 md:grid-cols-3 gap-6">
+                <div class="bg-white p-5 rounded-xl shadow-sm border border-gray-100 flex items-center gap-4">
+                    <div class="w-12 h-12 rounded-full bg-blue-50 flex items-center justify-center text-blue-600 text-xl"><i class="fas fa-envelope"></i></div>
+                    <div>
+                        <p class="text-sm text-gray-500 font-medium">Total Messages</p>
+                        <h3 class="text-2xl font-bold text-gray-800">{{ total }}</h3>
+                    </div>
+                </div>
+                <div class="bg-white p-5 rounded-xl shadow-sm border border-gray-100 flex items-center gap-4">
+                    <div class="w-12 h-12 rounded-full bg-green-50 flex items-center justify-center text-green-600 text-xl"><i class="fas fa-calendar-day"></i></div>
+                    <div>
+                        <p class="text-sm text-gray-500 font-medium">New Today</p>
+                        <h3 class="text-2xl font-bold text-gray-800">{{ today }}</h3>
+                    </div>
+                </div>
+                <div class="bg-white p-5 rounded-xl shadow-sm border border-gray-100 flex items-center gap-4">
+                    <div class="w-12 h-12 rounded-full bg-purple-50 flex items-center justify-center text-purple-600 text-xl"><i class="fas fa-bolt"></i></div>
+                    <div>
+                        <p class="text-sm text-gray-500 font-medium">System Status</p>
+                        <h3 class="text-lg font-bold text-green-500">Operational</h3>
+                    </div>
+                </div>
+            </div>
+
+            <div class="flex-1 overflow-auto p-6 pt-0">
+                <div class="bg-white rounded-xl shadow-sm border border-gray-100 overflow-hidden">
+                    <div id="bulkBar" class="hidden p-3 border-b border-gray-100 bg-blue-50 items-center gap-2 text-sm">
+                        <span class="text-gray-600 mr-2"><span id="bulkCount">0</span> selected</span>
+                        <button onclick="bulkAction('read')" class="px-3 py-1 rounded-lg bg-white border hover:bg-gray-50">Mark read</button>
+                        <button onclick="bulkAction('unread')" class="px-3 py-1 rounded-lg bg-white border hover:bg-gray-50">Mark unread</button>
+                        <button onclick="bulkAction('archived')" class="px-3 py-1 rounded-lg bg-white border hover:bg-gray-50">Archive</button>
+                        <button onclick="bulkAction('delete')" class="px-3 py-1 rounded-lg bg-white border text-red-600 hover:bg-red-50">Delete</button>
+                    </div>
+                    <table class="w-full text-left border-collapse">
+                        <thead class="bg-gray-50 text-gray-500 text-xs uppercase font-semibold">
+                            <tr>
+                                <th class="p-4 w-8"><input type="checkbox" id="selectAll"></th>
+                                <th class="p-4">Sender Info</th>
+                                <th class="p-4">Message Snippet</th>
+                                <th class="p-4">Date</th>
+                                <th class="p-4 text-right">Actions</th>
+                            </tr>
+                        </thead>
+                        <tbody class="text-sm divide-y divide-gray-100">
+                            {% for msg in messages %}
+                            <tr class="hover:bg-gray-50 transition group" data-id="{{ msg.id }}" data-name="{{ msg.name }}" data-message="{{ msg.message }}">
+                                <td class="p-4"><input type="checkbox" class="row-select" value="{{ msg.id }}"></td>
+                                <td class="p-4">
+                                    <p class="font-bold text-gray-800">{{ msg.name }} <span class="status-badge ml-1 px-2 py-0.5 rounded-full bg-gray-100 text-gray-500 text-xs font-normal">{{ msg.status }}</span></p>
+                                    <p class="text-blue-500 text-xs">{{ msg.email }}</p>
+                                </td>
+                                <td class="p-4 text-gray-600 max-w-xs truncate cursor-pointer hover:text-blue-600" onclick="openRow(this)">
+                                    {{ msg.message }}
+                                </td>
+                                <td class="p-4 text-gray-400 text-xs whitespace-nowrap">
+                                    {{ msg.date.strftime('%b %d, %H:%M') }}
+                                </td>
+                                <td class="p-4 text-right">
+                                    <div class="flex justify-end gap-2">
+                                        <button onclick="openRow(this)" class="p-2 rounded-lg bg-gray-100 text-gray-600 hover:bg-blue-100 hover:text-blue-600 transition" title="View Full Message">
+                                            <i class="fas fa-eye"></i>
+                                        </button>
+                                        
+                                        <a href="mailto:{{ msg.email }}?subject=Re: Inquiry from {{ msg.name }}&body=Hi {{ msg.name }},%0D%0A%0D%0AWe received your message: '{{ msg.message }}'%0D%0A%0D%0A..." class="p-2 rounded-lg bg-gray-100 text-gray-600 hover:bg-green-100 hover:text-green-600 transition" title="Reply via Email">
+                                            <i class="fas fa-reply"></i>
+                                        </a>
+
+                                        <form action="/admin/delete/{{ msg.id }}" method="POST" onsubmit="return confirmDelete(this)">
+                                            <button type="submit" class="p-2 rounded-lg bg-gray-100 text-gray-600 hover:bg-red-100 hover:text-red-600 transition" title="Delete">
+                                                <i class="fas fa-trash"></i>
+                                            </button>
+                                        </form>
+                                    </div>
+                                </td>
+                            </tr>
+                            {% else %}
+                            <tr>
+                                <td colspan="5" class="p-10 text-center text-gray-400 italic">No messages found.</td>
+                            </tr>
+                            {% endfor %}
+                        </tbody>
+                    </table>
+                    {% if next_cursor %}
+                    <div class="p-4 border-t border-gray-100 text-center">
+                        <a href="/admin?cursor={{ next_cursor }}{% if q %}&q={{ q | urlencode }}{% endif %}" class="text-sm text-blue-600 hover:underline">Older messages &rarr;</a>
+                    </div>
+                    {% endif %}
+                </div>
+            </div>
+        </main>
+    </div>
+
+    <div id="msgModal" class="fixed inset-0 bg-black/50 hidden items-center justify-center z-50 backdrop-blur-sm">
+        <div class="bg-white rounded-2xl shadow-2xl w-full max-w-lg mx-4 transform transition-all scale-95 opacity-0" id="modalContent">
+            <div class="p-6 border-b border-gray-100 flex justify-between items-center bg-gray-50 rounded-t-2xl">
+                <h3 class="font-bold text-lg text-gray-800" id="modalTitle">Message</h3>
+                <button onclick="closeModal()" class="text-gray-400 hover:text-gray-600 text-xl">&times;</button>
+            </div>
+            <div class="p-8">
+                <p class="text-gray-600 leading-relaxed text-lg" id="modalBody">...</p>
+            </div>
+            <div class="p-6 border-t border-gray-100 flex justify-end">
+                <button onclick="closeModal()" class="px-6 py-2 bg-gray-800 text-white rounded-lg hover:bg-gray-900 transition">Close</button>
+            </div>
+        </div>
+    </div>
+
+    <script>
+        // MODAL LOGIC
+        const modal = document.getElementById('msgModal');
+        const content = document.getElementById('modalContent');
+        
+        function openModal(name, message) {
+            document.getElementById('modalTitle').innerText = 'From: ' + name;
+            document.getElementById('modalBody').innerText = message;
+            modal.classList.remove('hidden');
+            modal.classList.add('flex');
+            // Animation
+            setTimeout(() => {
+                content.classList.remove('scale-95', 'opacity-0');
+                content.classList.add('scale-100', 'opacity-100');
+            }, 10);
+        }
+
+        // Message text comes from the public contact form: read it from data-*
+        // attributes, never interpolate it into inline JavaScript
+        function openRow(el) {
+            const row = el.closest('tr');
+            openModal(row.dataset.name, row.dataset.message);
+        }
+
+        function confirmDelete(form) {
+            return confirm('Permanently delete message from ' + form.closest('tr').dataset.name + '?');
+        }
+
+        function closeModal() {
+            content.classList.remove('scale-100', 'opacity-100');
+            content.classList.add('scale-95', 'opacity-0');
+            setTimeout(() => {
+                modal.classList.add('hidden');
+                modal.classList.remove('flex');
+            }, 200);
+        }
+
+        // BULK ACTIONS (one request, one SQL statement, no page reload)
+        const selected = () => Array.from(document.querySelectorAll('.row-select:checked')).map(el => parseInt(el.value));
+
+        function refreshBulkBar() {
+            const count = selected().length;
+            const bar = document.getElementById('bulkBar');
+            document.getElementById('bulkCount').innerText = count;
+            bar.classList.toggle('hidden', count === 0);
+            bar.classList.toggle('flex', count > 0);
+        }
+
+        document.getElementById('selectAll').addEventListener('change', function(e) {
+            document.querySelectorAll('.row-select').forEach(el => el.checked = e.target.checked);
+            refreshBulkBar();
+        });
+        document.querySelectorAll('.row-select').forEach(el => el.addEventListener('change', refreshBulkBar));
+
+        async function bulkAction(action) {
+            const ids = selected();
+            if (!ids.length) return;
+            if (action === 'delete' && !confirm('Permanently delete ' + ids.length + ' message(s)?')) return;
+            const res = await fetch('/api/messages/bulk', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ action, ids })
+            });
+            const data = await res.json();
+            if (!res.ok) return alert(data.error);
+            const labels = { read: 'Read', unread: 'Unread', archived: 'Archived' };
+            ids.forEach(id => {
+                const row = document.querySelector('tr[data-id="' + id + '"]');
+                if (!row) return;
+                if (action === 'delete') row.remove();
+                else row.querySelector('.status-badge').innerText = labels[action];
+                row.querySelector('.row-select').checked = false;
+            });
+            document.getElementById('selectAll').checked = false;
+            refreshBulkBar();
+        }
+    </script>
+</body>
+</html>
+"""
+
+# Messages + registered clients side by side
+USERS = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <script src="https://cdn.tailwindcss.com"></script>
+    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
+</head>
+<body class="bg-gray-100 font-sans p-8">
+    <div class="max-w-6xl mx-auto">
+        <h1 class="text-3xl font-bold text-gray-800 mb-8">🚀 AIMatrix Admin</h1>
+        
+        <div class="grid grid-cols-1 md:grid-cols-2 gap-8">
+            <div class="bg-white rounded-xl shadow-lg p-6">
+                <h2 class="text-xl font-bold mb-4 border-b pb-2 text-blue-600">📩 Recent Messages</h2>
+                <div class="overflow-auto h-96">
+                    <table class="w-full text-sm">
+                        <thead class="text-left text-gray-500"><tr><th class="pb-2">From</th><th class="pb-2">Message</th></tr></thead>
+                        <tbody>
+                            {% for msg in messages %}
+                            <tr class="border-b border-gray-100 hover:bg-gray-50">
+                                <td class="py-3">
+                                    <p class="font-bold">{{ msg.name }}</p>
+                                    <p class="text-xs text-gray-400">{{ msg.email }}</p>
+                                </td>
+                                <td class="py-3 text-gray-600">{{ msg.message }}</td>
+                            </tr>
+                            {% else %}
+                            <tr><td colspan="2" class="text-center py-4 text-gray-400">No messages yet</td></tr>
+                            {% endfor %}
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+
+            <div class="bg-white rounded-xl shadow-lg p-6">
+                <h2 class="text-xl font-bold mb-4 border-b pb-2 text-green-600">👥 Registered Clients</h2>
+                <div class="overflow-auto h-96">
+                    <table class="w-full text-sm">
+                        <thead class="text-left text-gray-500"><tr><th class="pb-2">Client</th><th class="pb-2">Company</th><th class="pb-2">Joined</th></tr></thead>
+                        <tbody>
+                            {% for user in users %}
+                            <tr class="border-b border-gray-100 hover:bg-gray-50">
+                                <td class="py-3">
+                                    <p class="font-bold">{{ user.name }}</p>
+                                    <p class="text-xs text-gray-400">{{ user.email }}</p>
+                                </td>
+                                <td class="py-3 text-gray-500">{{ user.company or 'N/A' }}</td>
+                                <td class="py-3 text-xs text-gray-400">{{ user.created_at.strftime('%Y-%m-%d') }}</td>
+                            </tr>
+                            {% else %}
+                            <tr><td colspan="3" class="text-center py-4 text-gray-400">No registered users</td></tr>
+                            {% endfor %}
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+TEMPLATES = {
+    'admin/inbox.html': INBOX,
+    'admin/users.html': USERS,
+}
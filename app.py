@@ -1,415 +1,475 @@
+import functools
+import hmac
+import math
 import os
-from datetime import datetime, date
-from flask import Flask, request, jsonify, render_template_string, redirect, url_for
+from concurrent.futures import TimeoutError
+from datetime import datetime, time, timedelta
+import click
+from flask import Flask, Response, g, request, session, jsonify, stream_template, stream_with_context, redirect
+from jinja2 import ChoiceLoader, DictLoader
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
+
+import admin_templates
+import billing
+import export
+import hashing
+import hll
+import inference
+import metrics
+import inbox
+import ingest
+import retention
+import rollups
+import search
+import throttle
+import timeseries
+from models import db, ContactMessage, User
 
 # --- CONFIGURATION ---
 app = Flask(__name__)
-app.secret_key = 'admin-secret-key' # Required for sessions/security
+app.secret_key = os.environ.get('SECRET_KEY', 'admin-secret-key') # Required for sessions/security
+
+# Optional shared secret for the admin surface (see admin_required)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+if ADMIN_TOKEN and 'SECRET_KEY' not in os.environ:
+    raise RuntimeError("ADMIN_TOKEN needs SECRET_KEY, or admin sessions could be forged")
 
-# CORS: Keep this on "Allow All" to ensure your connection stays fixed
-CORS(app, resources={r"/*": {"origins": "*"}})
+# CORS: "Allow All" for the public frontend routes only. The admin pages and
+# the inbox/export APIs are same-origin, so other sites cannot drive them.
+PUBLIC_PATHS = r"/($|predict$|api/(register|login|contact|analytics)(/|$))"
+CORS(app, resources={PUBLIC_PATHS: {"origins": "*"}})
 
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///aimatrix.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db = SQLAlchemy(app)
+db.init_app(app)
+
+# Latency / SQL instrumentation (see metrics.py); no-op unless METRICS_ENABLED=1
+metrics.init_app(app, db)
+
+# Admin HTML lives in admin_templates.py; compiled once here, not per request
+app.jinja_env.loader = ChoiceLoader([app.jinja_env.loader, DictLoader(admin_templates.TEMPLATES)])
+for template_name in admin_templates.TEMPLATES:
+    app.jinja_env.get_template(template_name)
+
+# Micro-batched /predict model (see inference.py)
+predictor = inference.MicroBatcher(inference.load_model())
+
+# Buffered contact ingestion (see ingest.py); off unless CONTACT_WRITE_BEHIND=1
+contact_writer = ingest.WriteBehindQueue(app) if ingest.ENABLED else None
+
+# Hot/cold message tiering (see retention.py); background pass only with RETENTION_INTERVAL set
+compactor = retention.Compactor(app) if retention.INTERVAL > 0 else None
+if compactor:
+    app.before_request(compactor.ensure_started)
+
+# Rate limits and duplicate suppression on the public write endpoints (see throttle.py)
+limiter = throttle.Limiter() if throttle.ENABLED else None
+
+# What a dropped identical resubmission gets back, per endpoint
+DUPLICATE_RESPONSES = {
+    'contact': ({'success': True, 'message': 'Already received'}, 200),
+    'register': ({'success': False, 'error': 'This form was already submitted'}, 409),
+}
+
+def throttled(endpoint, data):
+    """Error response if the limiter drops this write, else None."""
+    g.dedupe_key = None
+    if not limiter:
+        return None
+    try:
+        ip = throttle.client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))
+        g.dedupe_key = limiter.check(endpoint, ip, data)
+    except throttle.Limited as e:
+        res = jsonify({'success': False, 'error': str(e)})
+        res.headers['Retry-After'] = str(math.ceil(e.retry_after))
+        return res, 429
+    except throttle.Duplicate:
+        body, status = DUPLICATE_RESPONSES[endpoint]
+        return jsonify(body), status
+    return None
+
+def write_failed():
+    # Do not let the dedupe cache swallow the client's retry of a failed write
+    if g.get('dedupe_key'):
+        limiter.failed(g.dedupe_key)
+
+def is_admin():
+    if session.get('admin'):
+        return True
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {ADMIN_TOKEN}')
+
+def admin_required(view):
+    """With ADMIN_TOKEN set, require `Authorization: Bearer <token>` or an
+    admin session (GET /admin/login?token=...). Without it the admin surface
+    stays open, as before, but same-origin only."""
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        if ADMIN_TOKEN and not is_admin():
+            return jsonify({"success": False, "error": "Admin login required"}), 401
+        return view(*args, **kwargs)
+    return wrapped
 
-# --- DATABASE MODELS ---
-class ContactMessage(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100))
-    email = db.Column(db.String(100))
-    message = db.Column(db.Text)
-    date = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='Unread') # New field
+def token_required(view):
+    """Like admin_required, but never open: without ADMIN_TOKEN the endpoint is
+    disabled. For the endpoints that can wipe or dump whole tables."""
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"success": False, "error": "Set ADMIN_TOKEN to enable this endpoint"}), 403
+        if not is_admin():
+            return jsonify({"success": False, "error": "Admin login required"}), 401
+        return view(*args, **kwargs)
+    return wrapped
 
 # --- API ROUTES (Frontend Connection) ---
 @app.route('/')
 def home():
     return jsonify({"status": "Online", "service": "AIMatrix Commercial Backend"})
 
+# 1. REGISTER
+@app.route('/api/register', methods=['POST'])
+def register():
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "error": "Request body must be a JSON object"}), 400
+    rejected = throttled('register', data)
+    if rejected:
+        return rejected
+    
+    # Securely hash the password (never store plain text!) in the hashing pool
+    try:
+        hashed_pw = hashing.hash_password(data['password'])
+    except hashing.HashingBusy as e:
+        write_failed()
+        return jsonify({"success": False, "error": str(e)}), 503
+    
+    # Duplicates are caught by the unique constraint on email, not a pre-query
+    try:
+        billing.create_user(data['name'], data['email'], hashed_pw, company=data.get('company', ''))
+        return jsonify({"success": True, "message": "Account created!"})
+    except billing.EmailTaken as e:
+        write_failed()
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        write_failed()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/login', methods=['POST'])
+def login():
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "error": "Request body must be a JSON object"}), 400
+    rejected = throttled('login', data)
+    if rejected:
+        return rejected
+    user = User.query.filter_by(email=data.get('email')).first()
+    try:
+        # Unknown emails still pay for a hash check (see hashing.py)
+        valid = hashing.verify_password(user.password if user else None, str(data.get('password') or ''))
+    except hashing.HashingBusy as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    if not valid:
+        return jsonify({"success": False, "error": "Invalid email or password"}), 401
+    
+    entitled = billing.entitlements(user.email)
+    return jsonify({
+        "success": True,
+        "user": {
+            "id": user.id, "name": user.name, "email": user.email, "plan": entitled.plan,
+            "paid_orders": entitled.paid_orders
+        }
+    })
+
+# 2. CONTACT FORM
 @app.route('/api/contact', methods=['POST'])
 def contact():
     data = request.json
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "error": "Request body must be a JSON object"}), 400
+    rejected = throttled('contact', data)
+    if rejected:
+        return rejected
+    if contact_writer:
+        return queue_contact(data)
     try:
         new_msg = ContactMessage(
             name=data.get('name'),
             email=data.get('email'),
             message=data.get('message')
         )
+        rollups.messages_added([new_msg]) # Same transaction as the insert
         db.session.add(new_msg)
         db.session.commit()
         return jsonify({'success': True, 'message': 'Saved'})
     except Exception as e:
+        db.session.rollback()
+        write_failed()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def queue_contact(data):
+    try:
+        pending = contact_writer.submit({
+            'name': data.get('name'),
+            'email': data.get('email'),
+            'message': data.get('message')
+        })
+    except ingest.QueueFull as e:
+        write_failed()
+        return jsonify({'success': False, 'error': str(e)}), 503
+    if not ingest.WAIT_DURABLE or not pending.wait(ingest.WAIT_TIMEOUT):
+        return jsonify({'success': True, 'message': 'Queued'}), 202
+    if pending.error:
+        write_failed()
+        return jsonify({'success': False, 'error': str(pending.error)}), 500
+    return jsonify({'success': True, 'message': 'Saved'})
+
+# 3. ANALYTICS
 @app.route('/api/analytics')
 def analytics():
-    # Real-time stats for your frontend
-    total = ContactMessage.query.count()
-    today_start = datetime.combine(date.today(), datetime.min.time())
-    today = ContactMessage.query.filter(ContactMessage.date >= today_start).count()
-    unique = db.session.query(ContactMessage.email).distinct().count()
+    # Served from the rollup counters: O(1) no matter how big the inbox gets
+    total, today, unique = rollups.snapshot()
     
     return jsonify({
         "success": True,
         "data": { "submissions": { "total": total, "today": today, "unique_emails": unique } }
     })
 
-# --- ADVANCED ADMIN DASHBOARD ---
-@app.route('/admin')
-def admin_panel():
-    messages = ContactMessage.query.order_by(ContactMessage.date.desc()).all()
-    total = len(messages)
-    today_count = sum(1 for m in messages if m.date.date() == date.today())
+@app.route('/api/analytics/timeseries')
+def analytics_timeseries():
+    bucket = request.args.get('bucket', 'day')
+    try:
+        points = timeseries.series(
+            bucket,
+            start=export.parse_bound(request.args.get('from')),
+            end=export.parse_bound(request.args.get('to'), end=True)
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     
-    # Professional Tailwind CSS Dashboard Template
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>AIMatrix | Command Center</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-            body { font-family: 'Inter', sans-serif; background-color: #f3f4f6; }
-            .glass { background: rgba(255, 255, 255, 0.95); backdrop-filter: blur(10px); }
-        </style>
-    </head>
-    <body>
-        <div class="flex h-screen overflow-hidden">
-            <aside class="w-64 bg-slate-900 text-white hidden md:flex flex-col">
-                <div class="p-6 text-center border-b border-slate-800">
-                    <h1 class="text-2xl font-bold bg-clip-text text-transparent bg-gradient-to-r from-pink-500 to-violet-500">AIMatrix</h1>
-                    <p class="text-xs text-slate-400 mt-1">ADMIN CONSOLE</p>
-                </div>
-                <nav class="flex-1 p-4 space-y-2">
-                    <a href="#" class="flex items-center gap-3 px-4 py-3 bg-slate-800 rounded-lg text-blue-400 font-medium">
-                        <i class="fas fa-inbox w-5"></i> Inbox
-                    </a>
-                    <a href="/" target="_blank" class="flex items-center gap-3 px-4 py-3 text-slate-400 hover:bg-slate-800 hover:text-white rounded-lg transition">
-                        <i class="fas fa-external-link-alt w-5"></i> Live Site
-                    </a>
-                </nav>
-                <div class="p-4 border-t border-slate-800">
-                    <div class="flex items-center gap-3">
-                        <div class="w-8 h-8 rounded-full bg-gradient-to-tr from-pink-500 to-violet-500 flex items-center justify-center font-bold">A</div>
-                        <div class="text-sm">
-                            <p class="font-medium">Administrator</p>
-                            <p class="text-xs text-slate-500">Super User</p>
-                        </div>
-                    </div>
-                </div>
-            </aside>
-
-            <main class="flex-1 flex flex-col overflow-hidden">
-                <header class="bg-white border-b border-gray-200 p-6 flex justify-between items-center">
-                    <h2 class="text-2xl font-bold text-gray-800">Messages Inbox</h2>
-                    <div class="flex gap-4">
-                        <input type="text" id="searchInput" placeholder="Search emails..." class="px-4 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 w-64 text-sm">
-                        <button onclick="window.location.reload()" class="p-2 text-gray-500 hover:text-blue-600 transition"><i class="fas fa-sync-alt"></i></button>
-                    </div>
-                </header>
-
-                <div class="p-6 grid grid-cols-1 md:grid-cols-3 gap-6">
-                    <div class="bg-white p-5 rounded-xl shadow-sm border border-gray-100 flex items-center gap-4">
-                        <div class="w-12 h-12 rounded-full bg-blue-50 flex items-center justify-center text-blue-600 text-xl"><i class="fas fa-envelope"></i></div>
-                        <div>
-                            <p class="text-sm text-gray-500 font-medium">Total Messages</p>
-                            <h3 class="text-2xl font-bold text-gray-800">{{ total }}</h3>
-                        </div>
-                    </div>
-                    <div class="bg-white p-5 rounded-xl shadow-sm border border-gray-100 flex items-center gap-4">
-                        <div class="w-12 h-12 rounded-full bg-green-50 flex items-center justify-center text-green-600 text-xl"><i class="fas fa-calendar-day"></i></div>
-                        <div>
-                            <p class="text-sm text-gray-500 font-medium">New Today</p>
-                            <h3 class="text-2xl font-bold text-gray-800">{{ today }}</h3>
-                        </div>
-                    </div>
-                    <div class="bg-white p-5 rounded-xl shadow-sm border border-gray-100 flex items-center gap-4">
-                        <div class="w-12 h-12 rounded-full bg-purple-50 flex items-center justify-center text-purple-600 text-xl"><i class="fas fa-bolt"></i></div>
-                        <div>
-                            <p class="text-sm text-gray-500 font-medium">System Status</p>
-                            <h3 class="text-lg font-bold text-green-500">Operational</h3>
-                        </div>
-                    </div>
-                </div>
-
-                <div class="flex-1 overflow-auto p-6 pt-0">
-                    <div class="bg-white rounded-xl shadow-sm border border-gray-100 overflow-hidden">
-                        <table class="w-full text-left border-collapse">
-                            <thead class="bg-gray-50 text-gray-500 text-xs uppercase font-semibold">
-                                <tr>
-                                    <th class="p-4">Sender Info</th>
-                                    <th class="p-4">Message Snippet</th>
-                                    <th class="p-4">Date</th>
-                                    <th class="p-4 text-right">Actions</th>
-                                </tr>
-                            </thead>
-                            <tbody class="text-sm divide-y divide-gray-100">
-                                {% for msg in messages %}
-                                <tr class="hover:bg-gray-50 transition group">
-                                    <td class="p-4">
-                                        <p class="font-bold text-gray-800">{{ msg.name }}</p>
-                                        <p class="text-blue-500 text-xs">{{ msg.email }}</p>
-                                    </td>
-                                    <td class="p-4 text-gray-600 max-w-xs truncate cursor-pointer hover:text-blue-600" onclick="openModal('{{ msg.name }}', '{{ msg.message }}')">
-                                        {{ msg.message }}
-                                    </td>
-                                    <td class="p-4 text-gray-400 text-xs whitespace-nowrap">
-                                        {{ msg.date.strftime('%b %d, %H:%M') }}
-                                    </td>
-                                    <td class="p-4 text-right">
-                                        <div class="flex justify-end gap-2">
-                                            <button onclick="openModal('{{ msg.name }}', '{{ msg.message }}')" class="p-2 rounded-lg bg-gray-100 text-gray-600 hover:bg-blue-100 hover:text-blue-600 transition" title="View Full Message">
-                                                <i class="fas fa-eye"></i>
-                                            </button>
-                                            
-                                            <a href="mailto:{{ msg.email }}?subject=Re: Inquiry from {{ msg.name }}&body=Hi {{ msg.name }},%0D%0A%0D%0AWe received your message: '{{ msg.message }}'%0D%0A%0D%0A..." class="p-2 rounded-lg bg-gray-100 text-gray-600 hover:bg-green-100 hover:text-green-600 transition" title="Reply via Email">
-                                                <i class="fas fa-reply"></i>
-                                            </a>
-
-                                            <form action="/admin/delete/{{ msg.id }}" method="POST" onsubmit="return confirm('Permanently delete message from {{ msg.name }}?')">
-                                                <button type="submit" class="p-2 rounded-lg bg-gray-100 text-gray-600 hover:bg-red-100 hover:text-red-600 transition" title="Delete">
-                                                    <i class="fas fa-trash"></i>
-                                                </button>
-                                            </form>
-                                        </div>
-                                    </td>
-                                </tr>
-                                {% else %}
-                                <tr>
-                                    <td colspan="4" class="p-10 text-center text-gray-400 italic">No messages found.</td>
-                                </tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                </div>
-            </main>
-        </div>
-
-        <div id="msgModal" class="fixed inset-0 bg-black/50 hidden items-center justify-center z-50 backdrop-blur-sm">
-            <div class="bg-white rounded-2xl shadow-2xl w-full max-w-lg mx-4 transform transition-all scale-95 opacity-0" id="modalContent">
-                <div class="p-6 border-b border-gray-100 flex justify-between items-center bg-gray-50 rounded-t-2xl">
-                    <h3 class="font-bold text-lg text-gray-800" id="modalTitle">Message</h3>
-                    <button onclick="closeModal()" class="text-gray-400 hover:text-gray-600 text-xl">&times;</button>
-                </div>
-                <div class="p-8">
-                    <p class="text-gray-600 leading-relaxed text-lg" id="modalBody">...</p>
-                </div>
-                <div class="p-6 border-t border-gray-100 flex justify-end">
-                    <button onclick="closeModal()" class="px-6 py-2 bg-gray-800 text-white rounded-lg hover:bg-gray-900 transition">Close</button>
-                </div>
-            </div>
-        </div>
-
-        <script>
-            // MODAL LOGIC
-            const modal = document.getElementById('msgModal');
-            const content = document.getElementById('modalContent');
-            
-            function openModal(name, message) {
-                document.getElementById('modalTitle').innerText = 'From: ' + name;
-                document.getElementById('modalBody').innerText = message;
-                modal.classList.remove('hidden');
-                modal.classList.add('flex');
-                // Animation
-                setTimeout(() => {
-                    content.classList.remove('scale-95', 'opacity-0');
-                    content.classList.add('scale-100', 'opacity-100');
-                }, 10);
-            }
-
-            function closeModal() {
-                content.classList.remove('scale-100', 'opacity-100');
-                content.classList.add('scale-95', 'opacity-0');
-                setTimeout(() => {
-                    modal.classList.add('hidden');
-                    modal.classList.remove('flex');
-                }, 200);
-            }
-
-            // SEARCH FILTER
-            document.getElementById('searchInput').addEventListener('keyup', function(e) {
-                const term = e.target.value.toLowerCase();
-                const rows = document.querySelectorAll('tbody tr');
-                
-                rows.forEach(row => {
-                    const text = row.innerText.toLowerCase();
-                    row.style.display = text.includes(term) ? '' : 'none';
-                });
-            });
-        </script>
-    </body>
-    </html>
-    """
-    return render_template_string(html, messages=messages, total=total, today=today_count)
-
-@app.route('/admin/delete/<int:msg_id>', methods=['POST'])
-def delete_message(msg_id):
-    msg = ContactMessage.query.get(msg_id)
-    if msg:
-        db.session.delete(msg)
-        db.session.commit()
-    return redirect('/admin')
-
-# --- MODELS ---
-class ContactMessage(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100))
-    email = db.Column(db.String(100))
-    message = db.Column(db.Text)
-    date = db.Column(db.DateTime, default=datetime.utcnow)
-
-# NEW: User Account Model
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100))
-    email = db.Column(db.String(100), unique=True, nullable=False)
-    password = db.Column(db.String(200), nullable=False) # Stores hashed password
-    company = db.Column(db.String(100))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-# --- ROUTES ---
-@app.route('/')
-def home():
-    return jsonify({"status": "Online", "mode": "Commercial"})
+    return jsonify({"success": True, "data": { "bucket": bucket, "series": points }})
 
-# 1. NEW REGISTER ROUTE
-@app.route('/api/register', methods=['POST'])
-def register():
-    data = request.json
+@app.route('/api/analytics/unique')
+def analytics_unique():
+    # Merged per-day HyperLogLog sketches; ?exact=true counts distinct emails in SQL instead
+    try:
+        end = export.parse_bound(request.args.get('to'), end=True)
+        start = export.parse_bound(request.args.get('from'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    end = end or datetime.combine(datetime.utcnow().date() + timedelta(days=1), time.min)
+    start = start or end - timedelta(days=7)
+    if start >= end:
+        return jsonify({"success": False, "error": "'from' must be before 'to'"}), 400
     
-    # Check if user already exists
-    if User.query.filter_by(email=data['email']).first():
-        return jsonify({"success": False, "error": "Email already registered"}), 400
+    exact = request.args.get('exact', '').lower() in ('1', 'true', 'yes')
+    if exact:
+        unique = rollups.exact_unique_senders(start, end)
+    else:
+        # Sketches are per day, so partial days at either edge count whole
+        last_day = end.date() if end.time() == time.min else end.date() + timedelta(days=1)
+        unique = rollups.unique_senders(start.date(), last_day)
     
-    # Securely hash the password (never store plain text!)
-    hashed_pw = generate_password_hash(data['password'], method='pbkdf2:sha256')
+    return jsonify({
+        "success": True,
+        "data": {
+            "from": start.isoformat(), "to": end.isoformat(), "unique_emails": unique,
+            "approximate": not exact, "standard_error": 0 if exact else round(hll.STANDARD_ERROR, 4)
+        }
+    })
+
+# 4. INBOX (keyset paginated, filtered in SQL)
+@app.route('/api/messages')
+@admin_required
+def list_messages():
+    try:
+        messages, next_cursor = inbox.page(
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit'),
+            q=request.args.get('q', '').strip(),
+            status=request.args.get('status'),
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     
-    new_user = User(
-        name=data['name'], 
-        email=data['email'], 
-        password=hashed_pw,
-        company=data.get('company', '')
-    )
+    return jsonify({
+        "success": True,
+        "data": { "messages": [inbox.serialize(m) for m in messages], "next_cursor": next_cursor }
+    })
+
+@app.route('/api/messages/search')
+@admin_required
+def search_messages():
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"success": False, "error": "Missing search query 'q'"}), 400
+    try:
+        page = int(request.args.get('page', 1))
+        hits, has_more = search.search(q, page=page, limit=request.args.get('limit'),
+                                       archive=request.args.get('archive') in ('1', 'true'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     
+    return jsonify({
+        "success": True,
+        "data": {
+            "hits": [dict(inbox.serialize(m), rank=rank) for m, rank in hits],
+            "page": max(1, page),
+            "has_more": has_more
+        }
+    })
+
+@app.route('/api/messages/bulk', methods=['POST'])
+@token_required
+def bulk_messages():
     try:
-        db.session.add(new_user)
-        db.session.commit()
-        return jsonify({"success": True, "message": "Account created!"})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        args = inbox.parse_bulk(request.json)
+        affected = inbox.bulk(**args)
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    return jsonify({"success": True, "data": { "action": args['action'], "affected": affected }})
 
-# 2. CONTACT FORM
-@app.route('/api/contact', methods=['POST'])
-def contact():
-    data = request.json
+# 5. BULK EXPORT (streamed, constant memory)
+@app.route('/api/export/<kind>')
+@token_required
+def export_data(kind):
+    fmt = request.args.get('format', 'csv')
+    if kind not in export.EXPORTS or fmt not in export.FORMATS:
+        return jsonify({"success": False, "error": "Unknown export kind or format"}), 404
+    gzip = request.args.get('gzip') in ('1', 'true')
     try:
-        new_msg = ContactMessage(
-            name=data.get('name'), 
-            email=data.get('email'), 
-            message=data.get('message')
+        body = export.stream(
+            kind, fmt,
+            start=export.parse_bound(request.args.get('from')),
+            end=export.parse_bound(request.args.get('to'), end=True),
+            gzip=gzip
         )
-        db.session.add(new_msg)
-        db.session.commit()
-        return jsonify({'success': True})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    filename = f"{kind}.{fmt}" + ('.gz' if gzip else '')
+    return Response(
+        stream_with_context(body),
+        mimetype='application/gzip' if gzip else export.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
 
-# 3. ANALYTICS
-@app.route('/api/analytics')
-def analytics():
-    total = ContactMessage.query.count()
-    today_start = datetime.combine(date.today(), datetime.min.time())
-    today = ContactMessage.query.filter(ContactMessage.date >= today_start).count()
-    unique = db.session.query(ContactMessage.email).distinct().count()
+# 6. AI PREDICTIONS (proxied here by vercel-backend/api/ai/predict.js)
+@app.route('/predict', methods=['POST'])
+def predict():
+    try:
+        inputs, single = inference.parse_request(request.json or {})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    try:
+        results = predictor.predict(inputs)
+    except (inference.Overloaded, TimeoutError):
+        return jsonify({"success": False, "error": "Prediction service busy, please retry"}), 503
     
-    return jsonify({
-        "success": True, 
-        "data": { "submissions": { "total": total, "today": today, "unique_emails": unique } }
-    })
+    return jsonify({"success": True, "data": results[0] if single else results})
+
+# 7. PROMETHEUS METRICS
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics.ENABLED:
+        return jsonify({"success": False, "error": "Metrics are disabled"}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# --- ADVANCED ADMIN DASHBOARD ---
+STREAM_BATCH = 500
+
+@app.route('/admin/login')
+def admin_login():
+    token = request.args.get('token', '')
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return jsonify({"success": False, "error": "Invalid admin token"}), 401
+    session['admin'] = True
+    return redirect('/admin') # drops the token from the address bar
 
-# 4. ADMIN DASHBOARD (Includes Users Tab)
 @app.route('/admin')
+@admin_required
 def admin_panel():
-    messages = ContactMessage.query.order_by(ContactMessage.date.desc()).all()
-    users = User.query.order_by(User.created_at.desc()).all() # Fetch users
+    q = request.args.get('q', '').strip()
+    try:
+        messages, next_cursor = inbox.page(cursor=request.args.get('cursor'), limit=request.args.get('limit'), q=q)
+    except ValueError:
+        return redirect('/admin')
+    total, today_count, _ = rollups.snapshot()
+    
+    return stream_template('admin/inbox.html', messages=messages, total=total, today=today_count, q=q, next_cursor=next_cursor)
+
+# Messages + registered clients side by side
+@app.route('/admin/users')
+@admin_required
+def admin_users():
+    # Streamed in batches (server-side cursor on Postgres) while the page renders,
+    # so memory stays flat however large the tables get
+    messages = ContactMessage.query.order_by(ContactMessage.date.desc()).yield_per(STREAM_BATCH)
+    users = User.query.order_by(User.created_at.desc()).yield_per(STREAM_BATCH)
     
-    # Simple Admin with Tabs
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <script src="https://cdn.tailwindcss.com"></script>
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-    </head>
-    <body class="bg-gray-100 font-sans p-8">
-        <div class="max-w-6xl mx-auto">
-            <h1 class="text-3xl font-bold text-gray-800 mb-8">🚀 AIMatrix Admin</h1>
-            
-            <div class="grid grid-cols-1 md:grid-cols-2 gap-8">
-                <div class="bg-white rounded-xl shadow-lg p-6">
-                    <h2 class="text-xl font-bold mb-4 border-b pb-2 text-blue-600">📩 Recent Messages</h2>
-                    <div class="overflow-auto h-96">
-                        <table class="w-full text-sm">
-                            <thead class="text-left text-gray-500"><tr><th class="pb-2">From</th><th class="pb-2">Message</th></tr></thead>
-                            <tbody>
-                                {% for msg in messages %}
-                                <tr class="border-b border-gray-100 hover:bg-gray-50">
-                                    <td class="py-3">
-                                        <p class="font-bold">{{ msg.name }}</p>
-                                        <p class="text-xs text-gray-400">{{ msg.email }}</p>
-                                    </td>
-                                    <td class="py-3 text-gray-600">{{ msg.message }}</td>
-                                </tr>
-                                {% else %}
-                                <tr><td colspan="2" class="text-center py-4 text-gray-400">No messages yet</td></tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                </div>
-
-                <div class="bg-white rounded-xl shadow-lg p-6">
-                    <h2 class="text-xl font-bold mb-4 border-b pb-2 text-green-600">👥 Registered Clients</h2>
-                    <div class="overflow-auto h-96">
-                        <table class="w-full text-sm">
-                            <thead class="text-left text-gray-500"><tr><th class="pb-2">Client</th><th class="pb-2">Company</th><th class="pb-2">Joined</th></tr></thead>
-                            <tbody>
-                                {% for user in users %}
-                                <tr class="border-b border-gray-100 hover:bg-gray-50">
-                                    <td class="py-3">
-                                        <p class="font-bold">{{ user.name }}</p>
-                                        <p class="text-xs text-gray-400">{{ user.email }}</p>
-                                    </td>
-                                    <td class="py-3 text-gray-500">{{ user.company or 'N/A' }}</td>
-                                    <td class="py-3 text-xs text-gray-400">{{ user.created_at.strftime('%Y-%m-%d') }}</td>
-                                </tr>
-                                {% else %}
-                                <tr><td colspan="3" class="text-center py-4 text-gray-400">No registered users</td></tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    return render_template_string(html, messages=messages, users=users)
+    return stream_template('admin/users.html', messages=messages, users=users)
+
+@app.route('/admin/delete/<int:msg_id>', methods=['POST'])
+@admin_required
+def delete_message(msg_id):
+    inbox.bulk('delete', ids=[msg_id])
+    return redirect('/admin')
+
+# --- MAINTENANCE COMMANDS ---
+@app.cli.command('rebuild-rollups')
+@click.option('--dry-run', is_flag=True, help='Only report drift, do not rewrite the counters.')
+def rebuild_rollups_command(dry_run):
+    """Recompute the analytics counters from contact_message."""
+    drift = rollups.rebuild(dry_run=dry_run)
+    for name, (stored, actual) in sorted(drift.items()):
+        click.echo(f"{name}: {stored} -> {actual}")
+    click.echo(f"{len(drift)} counter(s) {'out of sync' if dry_run else 'repaired'}")
+
+@app.cli.command('rebuild-sketches')
+def rebuild_sketches_command():
+    """Recompute the per-day unique-sender sketches from contact_message."""
+    days = rollups.rebuild_sketches()
+    click.echo(f"Rebuilt sketches for {days} day(s)")
+
+@app.cli.command('compact-messages')
+@click.option('--days', type=int, default=None, help='Archive messages older than this (default: RETENTION_DAYS).')
+@click.option('--batch-size', type=int, default=retention.BATCH_SIZE, show_default=True)
+@click.option('--max-batches', type=int, default=None, help='Stop after this many batches.')
+@click.option('--dry-run', is_flag=True, help='Only report how many messages are due.')
+def compact_messages_command(days, batch_size, max_batches, dry_run):
+    """Move old messages from the inbox to the archive table in small batches."""
+    before = retention.cutoff(days)
+    if before is None:
+        click.echo("Retention is disabled (RETENTION_DAYS=0)")
+        return
+    if dry_run:
+        click.echo(f"{retention.due(before)} message(s) older than {before:%Y-%m-%d %H:%M} due for archiving")
+        return
+    moved = retention.compact(before, batch_size=batch_size, max_batches=max_batches)
+    click.echo(f"Archived {moved} message(s)")
+
+@app.cli.command('mark-paid')
+@click.argument('order_id')
+@click.option('--plan', type=click.Choice(billing.PLANS), help="Also move the order's user to this plan.")
+def mark_paid_command(order_id, plan):
+    """Flip an order to paid and refresh its user's entitlements."""
+    order = billing.mark_paid(order_id, plan=plan)
+    if order is None:
+        raise click.ClickException(f"No order {order_id}")
+    click.echo(f"Order {order.order_id} ({order.user_email}) is paid")
+
+@app.cli.command('backfill-search')
+def backfill_search_command():
+    """Index every existing message, inbox and archive, for full-text search (concurrently on Postgres)."""
+    search.backfill()
+    click.echo("Search index rebuilt")
 
 with app.app_context():
     db.create_all()
+    search.install()
 
 if __name__ == '__main__':
     app.run(debug=True)
-
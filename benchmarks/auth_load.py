@@ -0,0 +1,94 @@
+"""Register/login throughput under mixed load, inline hashing vs the hashing pool.
+
+Each HASH_WORKERS setting runs in a fresh interpreter against a throwaway
+SQLite database. Client threads loop over a weighted mix of register, login,
+contact and analytics requests through the Flask test client for --duration
+seconds, then the per-route throughput and latency percentiles are printed
+as JSON.
+
+    python benchmarks/auth_load.py --hash-workers 0,2,4 --clients 16 --duration 10
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from common import ROOT, run_child, summarize
+
+MIX = [('register', 1), ('login', 2), ('contact', 4), ('analytics', 4)]
+
+
+def run_once(args):
+    sys.path.insert(0, ROOT)
+    from app import app
+
+    client = app.test_client()
+    seed_email = 'seed@bench.local'
+    client.post('/api/register', json={'name': 'Seed', 'email': seed_email, 'password': 'secret'})
+
+    ops = [name for name, weight in MIX for _ in range(weight)]
+    latencies = {name: [] for name, _ in MIX}
+    errors = {name: 0 for name, _ in MIX}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + args.duration
+
+    def worker():
+        client = app.test_client()
+        rng = random.Random()
+        while time.perf_counter() < stop_at:
+            op = rng.choice(ops)
+            started = time.perf_counter()
+            if op == 'register':
+                res = client.post('/api/register', json={
+                    'name': 'Bench', 'email': f'{uuid.uuid4().hex}@bench.local', 'password': 'secret'})
+            elif op == 'login':
+                res = client.post('/api/login', json={'email': seed_email, 'password': 'secret'})
+            elif op == 'contact':
+                res = client.post('/api/contact', json={'name': 'Bench', 'email': 'c@bench.local', 'message': 'hi'})
+            else:
+                res = client.get('/api/analytics')
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[op].append(elapsed)
+                if res.status_code >= 400:
+                    errors[op] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    report = {op: summarize(values, errors[op], args.duration) for op, values in latencies.items()}
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hash-workers', default='0,4', help='comma separated HASH_WORKERS values to compare')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--run', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_once(args)
+        return
+
+    results = {}
+    for workers in args.hash_workers.split(','):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, HASH_WORKERS=workers, DATABASE_URL=f"sqlite:///{tmp}/bench.db")
+            env.setdefault('RATE_LIMIT_ENABLED', '0') # every request comes from one IP
+            results[f"hash_workers={workers}"] = run_child(
+                __file__, ['--run', '--clients', str(args.clients), '--duration', str(args.duration)], env)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
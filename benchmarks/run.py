@@ -0,0 +1,231 @@
+"""Reproducible load test of the main routes at several data scales.
+
+For every scale a throwaway SQLite database (or --database-url) is seeded with
+benchmarks/seed.py, then each route is driven with --requests requests from
+--concurrency client threads. Each --mode gets its own freshly seeded
+database:
+- client     in-process through the Flask test client
+- gunicorn   over HTTP against gunicorn serving the Flask app (app:app)
+- uvicorn    over HTTP against uvicorn serving the ASGI app (main:app)
+
+    python benchmarks/run.py --scales 1k,100k,1m --requests 500 --concurrency 16 --out bench.json
+    python benchmarks/run.py --mode gunicorn,uvicorn --routes contact,analytics --concurrency 200
+
+The JSON report records latency percentiles, throughput and peak RSS per
+route, plus the git revision and settings, so two runs can be diffed.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from common import ROOT, git_revision, run_child, summarize
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROUTES = ['contact', 'register', 'analytics', 'admin', 'admin_delete']
+
+
+def request_for(route, i):
+    """(method, path, json body) of the i-th request against `route`."""
+    if route == 'contact':
+        return 'POST', '/api/contact', {'name': 'Bench', 'email': f'bench{i}@example.com', 'message': 'load test'}
+    if route == 'register':
+        return 'POST', '/api/register', {'name': 'Bench', 'email': f'{uuid.uuid4().hex}@example.com', 'password': 'secret'}
+    if route == 'analytics':
+        return 'GET', '/api/analytics', None
+    if route == 'admin':
+        return 'GET', '/admin', None
+    # Seeded ids start at 1, so every delete hits a distinct existing row
+    return 'POST', f'/admin/delete/{i + 1}', None
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def http_sender(base_url):
+    opener = urllib.request.build_opener(_NoRedirect)
+
+    def send(method, path, body):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with opener.open(req) as res:
+                res.read()
+                return res.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+    return send
+
+
+def client_sender():
+    sys.path.insert(0, ROOT)
+    from app import app
+    local = threading.local()
+
+    def send(method, path, body):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        res = local.client.open(path, method=method, json=body)
+        res.get_data() # drain streamed responses
+        return res.status_code
+    return send
+
+
+def proc_peak_rss(pid):
+    """Peak RSS in bytes of `pid` plus its direct children (Linux /proc)."""
+    total = 0
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total
+
+
+def drive(args):
+    send = http_sender(args.url) if args.url else client_sender()
+
+    def peak_rss():
+        if args.server_pid:
+            return proc_peak_rss(args.server_pid)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # KiB on Linux
+
+    report = {}
+    for route in args.routes.split(','):
+        counter = itertools.count()
+        latencies, errors = [], []
+
+        def one(_):
+            method, path, body = request_for(route, next(counter))
+            started = time.perf_counter()
+            status = send(method, path, body)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            list(pool.map(one, range(args.requests)))
+        wall = time.perf_counter() - started
+        report[route] = dict(summarize(latencies, len(errors), wall),
+                             peak_rss_mb=round(peak_rss() / 2 ** 20, 1))
+    print(json.dumps(report))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, env, args):
+    port = free_port()
+    if mode == 'gunicorn':
+        command = ['gunicorn', '-w', str(args.workers), '--threads', str(args.threads),
+                   '-b', f'127.0.0.1:{port}', 'app:app']
+    else:
+        command = ['uvicorn', '--workers', str(args.workers), '--host', '127.0.0.1', '--port', str(port),
+                   '--no-access-log', 'main:app']
+    proc = subprocess.Popen([sys.executable, '-m'] + command,
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return proc, f'http://127.0.0.1:{port}'
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{mode} did not start")
+
+
+def run_scale(scale, mode, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=args.database_url or f'sqlite:///{tmp}/bench.db')
+        env.setdefault('RATE_LIMIT_ENABLED', '0') # every request comes from one IP
+        started = time.perf_counter()
+        seeded = run_child(os.path.join(HERE, 'seed.py'), [scale], env)
+        seed_seconds = round(time.perf_counter() - started, 1)
+
+        drive_args = ['--drive', '--routes', args.routes, '--requests', str(args.requests),
+                      '--concurrency', str(args.concurrency)]
+        if mode == 'client':
+            routes = run_child(__file__, drive_args, env)
+        else:
+            server, url = start_server(mode, env, args)
+            try:
+                routes = run_child(__file__, drive_args + ['--url', url, '--server-pid', str(server.pid)], env)
+            finally:
+                server.terminate()
+                server.wait()
+    return {'seeded': seeded, 'seed_seconds': seed_seconds, 'routes': routes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='1k,100k', help='comma separated: 1k, 100k, 1m or a row count')
+    parser.add_argument('--routes', default=','.join(ROUTES))
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mode', default='client', help='comma separated: client, gunicorn, uvicorn')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn/uvicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--database-url', help='benchmark against this database instead of a temp SQLite file')
+    parser.add_argument('--out', help='write the JSON report here as well as to stdout')
+    parser.add_argument('--drive', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    parser.add_argument('--server-pid', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.drive:
+        drive(args)
+        return
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': {k: v for k, v in vars(args).items() if k not in ('drive', 'url', 'server_pid', 'out')},
+        },
+        'results': {
+            scale: {mode: run_scale(scale, mode, args) for mode in args.mode.split(',')}
+            for scale in args.scales.split(',')
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Fill a database with synthetic messages, users and orders.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/seed.py 100k
+
+Rows are inserted with executemany in chunks, and every user shares one
+precomputed password hash ("secret"), so seeding a million rows takes
+seconds rather than hours. The rollup counters are rebuilt at the end so
+/api/analytics reports the seeded data.
+"""
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+from common import ROOT
+
+CHUNK = 10000
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000, '1m': 1000000}
+WORDS = ("automation pricing demo support login error invoice plan upgrade agency partner "
+         "workflow integration api dashboard quote trial team enterprise help").split()
+
+
+def parse_scale(value):
+    value = value.lower()
+    return SCALES[value] if value in SCALES else int(value)
+
+
+def seed(rows, seed_value=42):
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+
+    import rollups
+    from app import app
+    from models import db, ContactMessage, User, Order
+
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    password = generate_password_hash('secret', method='pbkdf2:sha256')
+    statuses = ['Unread'] * 6 + ['Read'] * 3 + ['Archived']
+    senders = max(1, rows // 4) # roughly four messages per distinct sender
+
+    def chunks(make):
+        for start in range(0, rows, CHUNK):
+            yield [make(i) for i in range(start, min(rows, start + CHUNK))]
+
+    def message(i):
+        return {
+            'name': f'Sender {i}',
+            'email': f'sender{rng.randrange(senders)}@example.com',
+            'message': ' '.join(rng.choices(WORDS, k=rng.randint(5, 30))),
+            'date': now - timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+            'status': rng.choice(statuses),
+        }
+
+    def user(i):
+        return {
+            'name': f'User {i}',
+            'email': f'user{i}@example.com',
+            'password': password,
+            'company': f'Company {i % 1000}',
+            'plan_type': rng.choice(['free', 'free', 'starter', 'growth']),
+            'created_at': now - timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+        }
+
+    def order(i):
+        return {
+            'order_id': f'order_{i}',
+            'user_email': f'user{rng.randrange(rows)}@example.com',
+            'amount': rng.choice([49900, 99900, 199900]),
+            'status': rng.choice(['pending', 'paid', 'paid']),
+        }
+
+    with app.app_context():
+        for model, make in ((ContactMessage, message), (User, user), (Order, order)):
+            for batch in chunks(make):
+                db.session.execute(insert(model), batch)
+                db.session.commit()
+        rollups.rebuild()
+        rollups.rebuild_sketches()
+    return {'messages': rows, 'users': rows, 'orders': rows}
+
+
+if __name__ == '__main__':
+    print(json.dumps(seed(parse_scale(sys.argv[1] if len(sys.argv) > 1 else '1k'))))
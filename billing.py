@@ -0,0 +1,142 @@
+"""User, plan and order lookups.
+
+- Paid orders are summed by (user_email, status), which the
+  ix_order_user_email_status index answers without scanning the table.
+- Duplicate signups are detected by the unique constraint on user.email when
+  the row is inserted (EmailTaken), not by a SELECT beforehand: one round
+  trip instead of two, and no window for two concurrent signups to both pass
+  the check.
+- entitlements() is cached per process in a TTL + LRU cache
+  (ENTITLEMENT_CACHE_SIZE entries, ENTITLEMENT_TTL seconds). Every entry
+  records the billing generation (a rollup_counter row, GENERATION) it was
+  read at. mark_paid() and set_plan() bump the generation in the same
+  transaction as their change, so every process, web workers as well as
+  the `flask mark-paid` CLI, drops its stale entries on the next lookup. A
+  hit costs one primary-key read instead of the user and orders queries.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+import rollups
+from models import db, User, Order, RollupCounter
+
+CACHE_SIZE = int(os.environ.get('ENTITLEMENT_CACHE_SIZE', 10000))
+TTL = float(os.environ.get('ENTITLEMENT_TTL', 60))
+
+PLANS = ('free', 'starter', 'growth')
+PAID = 'paid'
+GENERATION = 'billing.generation'
+
+Entitlements = namedtuple('Entitlements', ['plan', 'paid_orders', 'paid_amount'])
+
+
+class EmailTaken(Exception):
+    pass
+
+
+class TTLCache:
+    """Thread-safe LRU of at most `maxsize` entries, each valid for `ttl` seconds."""
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict() # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+cache = TTLCache()
+
+
+def create_user(name, email, password_hash, company='', session=None):
+    """Insert and commit a user; raises EmailTaken if the email is registered."""
+    session = db.session if session is None else session
+    user = User(name=name, email=email, password=password_hash, company=company)
+    rollups.users_added([user], session=session) # same transaction as the insert
+    session.add(user)
+    try:
+        session.commit()
+    except IntegrityError as e:
+        session.rollback()
+        # email is the only unique column besides the primary key
+        raise EmailTaken("Email already registered") from e
+    return user
+
+
+def _generation(session):
+    return session.scalar(select(RollupCounter.value).where(RollupCounter.name == GENERATION)) or 0
+
+
+def entitlements(email, session=None):
+    """Entitlements of the user with `email` (None if there is none), cached."""
+    session = db.session if session is None else session
+    # Read before the data, so an entry is never newer than its generation
+    generation = _generation(session)
+    cached = cache.get(email)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    user = session.execute(select(User.plan_type).where(User.email == email)).first()
+    if user is None:
+        return None
+    count, amount = session.execute(
+        select(func.count(Order.id), func.coalesce(func.sum(Order.amount), 0))
+        .where(Order.user_email == email, Order.status == PAID)).one()
+    result = Entitlements(user.plan_type or 'free', count, amount)
+    cache.set(email, (generation, result))
+    return result
+
+
+def set_plan(email, plan, session=None):
+    """Move a user to `plan` and commit; returns False if there is no such user."""
+    if plan not in PLANS:
+        raise ValueError(f"plan must be one of {', '.join(PLANS)}")
+    session = db.session if session is None else session
+    result = session.execute(update(User).where(User.email == email).values(plan_type=plan))
+    rollups.increment(GENERATION, session=session)
+    session.commit()
+    cache.invalidate(email)
+    return result.rowcount > 0
+
+
+def mark_paid(order_id, plan=None, session=None):
+    """Flip an order to paid (optionally moving its user to `plan`) and
+    invalidate the user's cached entitlements. Returns the order, or None if
+    there is no such order."""
+    session = db.session if session is None else session
+    order = session.scalar(select(Order).where(Order.order_id == order_id))
+    if order is None:
+        return None
+    if order.status != PAID:
+        order.status = PAID
+        rollups.increment(GENERATION, session=session)
+        session.commit()
+    cache.invalidate(order.user_email)
+    if plan:
+        set_plan(order.user_email, plan, session=session)
+    return order
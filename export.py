@@ -0,0 +1,119 @@
+"""Streaming bulk export of messages, users and orders.
+
+Rows are read as plain tuples through a server-side cursor (yield_per) and
+written out one batch at a time, so an export holds a single batch in memory
+whether the table has a thousand rows or ten million.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from models import db, ContactMessage, ArchivedMessage, User, Order
+
+BATCH_SIZE = 1000
+
+# kind -> (model, exported columns, date column used by from/to)
+EXPORTS = {
+    'messages': (ContactMessage, ['id', 'name', 'email', 'message', 'date', 'status'], 'date'),
+    'archived_messages': (ArchivedMessage, ['id', 'name', 'email', 'message', 'date', 'status', 'archived_at'], 'date'),
+    'users': (User, ['id', 'name', 'email', 'company', 'plan_type', 'created_at'], 'created_at'),
+    'orders': (Order, ['id', 'order_id', 'user_email', 'amount', 'status'], None),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_bound(value, end=False):
+    """Parse an ISO date/datetime query arg. A bare date used as an upper
+    bound covers that whole day; an offset is converted to naive UTC, which
+    is how dates are stored. Raises ValueError on bad input."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def rows(kind, start=None, end=None):
+    """Return an iterator of raw row tuples for an export, oldest first.
+
+    Arguments are validated eagerly (ValueError); the query itself only runs
+    once the iterator is consumed.
+    """
+    model, columns, date_column = EXPORTS[kind]
+    if (start or end) and not date_column:
+        raise ValueError(f"'{kind}' has no date column to filter on")
+    stmt = select(*[getattr(model, c) for c in columns]).order_by(model.id)
+    if start:
+        stmt = stmt.where(getattr(model, date_column) >= start)
+    if end:
+        stmt = stmt.where(getattr(model, date_column) < end)
+    return _iterate(stmt)
+
+
+def _iterate(stmt):
+    result = db.session.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _batched(rows_iter):
+    batch = []
+    for row in rows_iter:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(columns, rows_iter):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for batch in _batched(rows_iter):
+        writer.writerows([_plain(v) for v in row] for row in batch)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def ndjson_chunks(columns, rows_iter):
+    for batch in _batched(rows_iter):
+        yield ''.join(json.dumps(dict(zip(columns, map(_plain, row)))) + '\n' for row in batch)
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31) # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(kind, fmt, start=None, end=None, gzip=False):
+    """Return the body generator for an export."""
+    columns = EXPORTS[kind][1]
+    data = rows(kind, start, end)
+    chunks = csv_chunks(columns, data) if fmt == 'csv' else ndjson_chunks(columns, data)
+    if gzip:
+        return gzipped(chunks)
+    return (chunk.encode() for chunk in chunks)
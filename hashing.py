@@ -0,0 +1,91 @@
+"""Password hashing off the request thread.
+
+PBKDF2 is deliberately slow. Running it inline lets a burst of signups/logins
+occupy every gunicorn worker's CPU at once. Here it runs in a small process
+pool instead:
+
+- HASH_WORKERS       pool size (0 = hash inline, the old behaviour)
+- HASH_QUEUE_DEPTH   max jobs queued or running before new ones are refused
+- HASH_TIMEOUT       seconds a request waits for its result
+
+Callers get HashingBusy when the queue is full or the wait times out and
+should answer 503 so clients back off instead of piling up.
+
+verify_password(None, ...) checks against a dummy hash and returns False, so
+a login for an unknown email costs as much as one for a real account and
+timing does not reveal which emails are registered.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+METHOD = 'pbkdf2:sha256'
+WORKERS = int(os.environ.get('HASH_WORKERS', min(4, os.cpu_count() or 1)))
+QUEUE_DEPTH = int(os.environ.get('HASH_QUEUE_DEPTH', WORKERS * 8))
+TIMEOUT = float(os.environ.get('HASH_TIMEOUT', 10))
+
+
+class HashingBusy(Exception):
+    pass
+
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_slots = threading.BoundedSemaphore(max(1, QUEUE_DEPTH))
+_dummy_hash = None
+
+
+def _get_pool():
+    # One pool per process; a pool inherited through fork is unusable
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(max_workers=WORKERS)
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _run(fn, *args):
+    if WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy("Too many pending password operations")
+    try:
+        future = _get_pool().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    # The slot is freed when the job actually finishes, even if we stop waiting
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=TIMEOUT)
+    except TimeoutError:
+        raise HashingBusy("Password operation timed out") from None
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, METHOD)
+
+
+def verify_password(pwhash, password):
+    """True if `password` matches `pwhash`; pwhash None (no such user) is
+    always False, after the same amount of work."""
+    global _dummy_hash
+    if pwhash is None:
+        if _dummy_hash is None:
+            # Same method and iterations as real hashes; generated once per process
+            _dummy_hash = generate_password_hash(os.urandom(16).hex(), METHOD)
+        _run(check_password_hash, _dummy_hash, password)
+        return False
+    return _run(check_password_hash, pwhash, password)
+
+
+def shutdown():
+    global _pool
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=True)
+        _pool = None
@@ -0,0 +1,47 @@
+"""Minimal HyperLogLog cardinality sketch.
+
+With P = 12 a sketch is 4096 one-byte registers (4 KiB). The relative
+standard error of an estimate is 1.04 / sqrt(4096) ~= 1.6%, so about 95% of
+estimates fall within +/-3.2% of the true count. Small cardinalities (below
+~10k) use linear counting and are close to exact. Merging sketches is an
+element-wise max, so the estimate for a union of days costs the same as for
+a single day.
+"""
+import hashlib
+import math
+
+import numpy as np
+
+P = 12
+M = 1 << P
+STANDARD_ERROR = 1.04 / math.sqrt(M)
+EMPTY = bytes(M)
+
+_ALPHA = 0.7213 / (1 + 1.079 / M)
+_TAIL_BITS = 64 - P
+
+
+def add(registers, value):
+    """Add `value` (a str) to a mutable bytearray of registers."""
+    h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+    index = h >> _TAIL_BITS
+    rank = _TAIL_BITS - (h & ((1 << _TAIL_BITS) - 1)).bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+
+def merge(sketches):
+    """Union of any number of register blobs."""
+    merged = np.zeros(M, dtype=np.uint8)
+    for blob in sketches:
+        np.maximum(merged, np.frombuffer(blob, dtype=np.uint8), out=merged)
+    return merged
+
+
+def estimate(registers):
+    regs = np.frombuffer(bytes(registers), dtype=np.uint8) if not isinstance(registers, np.ndarray) else registers
+    raw = _ALPHA * M * M / float(np.sum(np.exp2(-regs.astype(np.float64))))
+    zeros = int(np.count_nonzero(regs == 0))
+    if raw <= 2.5 * M and zeros:
+        return round(M * math.log(M / zeros))
+    return round(raw)
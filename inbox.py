@@ -0,0 +1,165 @@
+"""Keyset-paginated, server-side filtered access to the contact inbox.
+
+Pages are ordered newest first on (date, id) and addressed by an opaque cursor
+holding the last row's key, so fetching page N costs the same as page 1 and
+rows inserted meanwhile never shift what the next page returns.
+
+Bulk triage (bulk()) reuses the same filters and runs as a single UPDATE or
+DELETE statement, whatever the number of rows it touches.
+"""
+import base64
+import os
+from datetime import datetime
+
+from sqlalchemy import and_, delete, or_, select, update
+
+import export
+import rollups
+from models import db, ContactMessage
+
+# Bulk action -> stored ContactMessage.status
+STATUSES = {'read': 'Read', 'unread': 'Unread', 'archived': 'Archived'}
+
+PAGE_SIZE = int(os.environ.get('INBOX_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = int(os.environ.get('INBOX_MAX_PAGE_SIZE', 200))
+
+
+def encode_cursor(msg):
+    raw = f"{msg.date.isoformat()}|{msg.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (date, id) from a cursor; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        stamp, msg_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(stamp), int(msg_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def page_size(limit):
+    if not limit:
+        return PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def criteria(q=None, status=None, start=None, end=None, ids=None, model=ContactMessage):
+    """WHERE clauses for the inbox filters, shared by listing and bulk actions.
+
+    `model` can also be ArchivedMessage, which has the same columns.
+    """
+    clauses = []
+    if ids is not None:
+        clauses.append(model.id.in_(ids))
+    if status:
+        clauses.append(model.status == status)
+    if start:
+        clauses.append(model.date >= start)
+    if end:
+        clauses.append(model.date < end)
+    if q:
+        term = f"%{q}%"
+        clauses.append(or_(
+            model.name.ilike(term),
+            model.email.ilike(term),
+            model.message.ilike(term),
+        ))
+    return clauses
+
+
+def filtered(q=None, status=None, model=ContactMessage):
+    """Base query with the inbox filters applied, in display order."""
+    query = model.query.filter(*criteria(q=q, status=status, model=model))
+    return query.order_by(model.date.desc(), model.id.desc())
+
+
+def page(cursor=None, limit=None, q=None, status=None):
+    """Return (messages, next_cursor); next_cursor is None on the last page."""
+    size = page_size(limit)
+    query = filtered(q=q, status=status)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            ContactMessage.date < last_date,
+            and_(ContactMessage.date == last_date, ContactMessage.id < last_id),
+        ))
+    # One extra row tells us whether another page exists without a COUNT(*)
+    rows = query.limit(size + 1).all()
+    messages = rows[:size]
+    next_cursor = encode_cursor(messages[-1]) if len(rows) > size else None
+    return messages, next_cursor
+
+
+def serialize(msg):
+    return {
+        "id": msg.id,
+        "name": msg.name,
+        "email": msg.email,
+        "message": msg.message,
+        "date": msg.date.isoformat() if msg.date else None,
+        "status": msg.status,
+    }
+
+
+def parse_bulk(data):
+    """bulk()'s arguments from a /api/messages/bulk JSON body; ValueError if invalid.
+
+    The body is {"action": ..., "ids": [...]} and/or "filter": {"q", "status", "from", "to"}.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    filters = data.get('filter')
+    if filters is None:
+        filters = {}
+    if not isinstance(filters, dict):
+        raise ValueError("filter must be an object")
+    for name in ('q', 'status', 'from', 'to'):
+        if filters.get(name) is not None and not isinstance(filters[name], str):
+            raise ValueError(f"filter.{name} must be a string")
+    return {
+        'action': data.get('action'),
+        'ids': data.get('ids'),
+        'q': filters.get('q'),
+        'status': filters.get('status'),
+        'start': export.parse_bound(filters.get('from')),
+        'end': export.parse_bound(filters.get('to'), end=True),
+    }
+
+
+def bulk(action, ids=None, q=None, status=None, start=None, end=None):
+    """Apply `action` ('read', 'unread', 'archived' or 'delete') to every message
+    matching the ids and/or filters as one set-based statement. Returns the
+    number of rows affected; raises ValueError on a bad request.
+    """
+    if action != 'delete' and action not in STATUSES:
+        raise ValueError(f"Unknown action: {action!r}")
+    if ids is not None and not (isinstance(ids, list)
+                                and all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        # Anything else could be coerced into ids nobody selected ("12" -> 1, 2)
+        raise ValueError("ids must be a list of integer message ids")
+    if not ids and not (q or status or start or end):
+        # An empty selector would otherwise match the whole table
+        raise ValueError("Provide message ids or at least one filter")
+    clauses = criteria(q=q, status=status, start=start, end=end, ids=ids)
+
+    if action != 'delete':
+        result = db.session.execute(
+            update(ContactMessage).where(*clauses).values(status=STATUSES[action])
+            .execution_options(synchronize_session=False))
+        db.session.commit()
+        return result.rowcount
+
+    # The rollup counters need the date/email of every deleted row
+    if db.session.get_bind().dialect.delete_returning:
+        removed = db.session.execute(
+            delete(ContactMessage).where(*clauses)
+            .returning(ContactMessage.date, ContactMessage.email)
+            .execution_options(synchronize_session=False)).all()
+    else:
+        removed = db.session.execute(select(ContactMessage.date, ContactMessage.email).where(*clauses)).all()
+        db.session.execute(delete(ContactMessage).where(*clauses).execution_options(synchronize_session=False))
+    rollups.messages_deleted(removed)
+    db.session.commit()
+    return len(removed)
@@ -0,0 +1,212 @@
+"""CPU-only inference behind POST /predict.
+
+Models implement a single method, predict_batch(inputs) -> outputs, taking and
+returning lists of equal length. The scheduler (MicroBatcher) holds concurrent
+requests for at most PREDICT_MAX_WAIT_MS, or until PREDICT_MAX_BATCH of them
+are waiting, runs them through the model as one vectorized call and hands each
+caller its own result.
+
+The model is picked with PREDICT_MODEL:
+- unset          the bundled TextClassifier (weights from PREDICT_MODEL_PATH
+                 if given, otherwise trained at startup on SEED_EXAMPLES)
+- "module:attr"  any importable factory returning a model object
+"""
+import abc
+import importlib
+import os
+import queue
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+import numpy as np
+
+MAX_BATCH = int(os.environ.get('PREDICT_MAX_BATCH', 32))
+MAX_WAIT = int(os.environ.get('PREDICT_MAX_WAIT_MS', 5)) / 1000
+QUEUE_SIZE = int(os.environ.get('PREDICT_QUEUE_SIZE', 1024))
+TIMEOUT = float(os.environ.get('PREDICT_TIMEOUT', 5))
+
+
+class Overloaded(Exception):
+    pass
+
+
+def parse_request(data):
+    """Return (inputs, single) from a /predict JSON body; ValueError if invalid.
+
+    Accepts {"text": "..."} for one prediction or {"inputs": [...]} for several.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    single = 'inputs' not in data
+    inputs = [data.get('text')] if single else data['inputs']
+    if not isinstance(inputs, list) or not inputs or not all(isinstance(i, str) for i in inputs):
+        raise ValueError("Send 'text' (string) or 'inputs' (list of strings)")
+    if len(inputs) > MAX_BATCH:
+        raise ValueError(f"At most {MAX_BATCH} inputs per request")
+    return inputs, single
+
+
+class Model(abc.ABC):
+    """Interface for /predict models."""
+
+    @abc.abstractmethod
+    def predict_batch(self, inputs):
+        """Return one output per input, in order."""
+
+
+# Tiny labelled set used when no trained weights are supplied: routes an
+# incoming contact message to the team that should answer it.
+SEED_EXAMPLES = [
+    ("How much does the growth plan cost per month?", 'sales'),
+    ("Can I get a quote for automating our lead pipeline?", 'sales'),
+    ("We want to buy the starter plan for our team", 'sales'),
+    ("Do you offer discounts or annual pricing?", 'sales'),
+    ("Interested in a demo of your AI automation platform", 'sales'),
+    ("My payment went through but my plan did not upgrade", 'support'),
+    ("I cannot log in to my dashboard, password reset fails", 'support'),
+    ("The workflow keeps failing with an error since yesterday", 'support'),
+    ("How do I connect my account to the API? It returns 401", 'support'),
+    ("Something is broken, the integration stopped working", 'support'),
+    ("We are an agency and would like to partner and resell", 'partnership'),
+    ("Affiliate or referral program for your product?", 'partnership'),
+    ("Collaboration proposal: co-marketing with our SaaS", 'partnership'),
+    ("Let's integrate our platforms, partnership opportunity", 'partnership'),
+    ("Cheap SEO backlinks, rank #1 on Google guaranteed!!!", 'spam'),
+    ("Congratulations you won a prize, click this link now", 'spam'),
+    ("Buy followers and crypto investment with 300% returns", 'spam'),
+    ("We build websites cheap, reply for offer, limited time", 'spam'),
+]
+
+
+class TextClassifier(Model):
+    """Multinomial logistic regression over hashed word/bigram counts."""
+
+    def __init__(self, weights, bias, labels, n_features=2 ** 12):
+        self.weights = weights # (n_features, n_classes)
+        self.bias = bias
+        self.labels = list(labels)
+        self.n_features = n_features
+
+    def features(self, texts):
+        x = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = re.findall(r'\w+', text.lower())
+            grams = tokens + [a + ' ' + b for a, b in zip(tokens, tokens[1:])]
+            for gram in grams:
+                # crc32, unlike hash(), is stable across processes and restarts
+                x[row, zlib.crc32(gram.encode()) % self.n_features] += 1
+        norms = np.linalg.norm(x, axis=1, keepdims=True)
+        return x / np.maximum(norms, 1e-9)
+
+    def predict_proba(self, texts):
+        logits = self.features(texts) @ self.weights + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_batch(self, inputs):
+        probs = self.predict_proba(inputs)
+        return [
+            {"label": self.labels[int(p.argmax())], "scores": dict(zip(self.labels, map(float, p)))}
+            for p in probs
+        ]
+
+    @classmethod
+    def fit(cls, texts, labels, n_features=2 ** 12, epochs=300, lr=0.5, l2=1e-3):
+        classes = sorted(set(labels))
+        model = cls(np.zeros((n_features, len(classes)), dtype=np.float32),
+                    np.zeros(len(classes), dtype=np.float32), classes, n_features)
+        x = model.features(texts)
+        y = np.eye(len(classes), dtype=np.float32)[[classes.index(l) for l in labels]]
+        for _ in range(epochs):
+            grad = model.predict_proba(texts) - y
+            model.weights -= lr * (x.T @ grad / len(texts) + l2 * model.weights)
+            model.bias -= lr * grad.mean(axis=0)
+        return model
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['weights'], data['bias'], data['labels'].tolist(), data['weights'].shape[0])
+
+    def save(self, path):
+        np.savez(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels))
+
+
+def load_model():
+    spec = os.environ.get('PREDICT_MODEL')
+    if spec:
+        module, _, attr = spec.partition(':')
+        return getattr(importlib.import_module(module), attr)()
+    path = os.environ.get('PREDICT_MODEL_PATH')
+    if path:
+        return TextClassifier.load(path)
+    texts, labels = zip(*SEED_EXAMPLES)
+    return TextClassifier.fit(list(texts), list(labels))
+
+
+class MicroBatcher:
+    def __init__(self, model, max_batch=MAX_BATCH, max_wait=MAX_WAIT, maxsize=QUEUE_SIZE):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        # Per process: the scheduler thread does not survive gunicorn's fork
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='predict-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, item):
+        """Queue one input; returns a Future resolving to its prediction."""
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            raise Overloaded("Prediction queue is full") from None
+        return future
+
+    def predict(self, inputs, timeout=TIMEOUT):
+        """Submit several inputs and wait for all of them (they batch together)."""
+        futures = [self.submit(item) for item in inputs]
+        deadline = time.monotonic() + timeout
+        return [f.result(timeout=max(0, deadline - time.monotonic())) for f in futures]
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [entry for entry in self._next_batch() if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                outputs = self.model.predict_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
@@ -0,0 +1,135 @@
+"""Optional write-behind ingestion for POST /api/contact.
+
+With CONTACT_WRITE_BEHIND=1, submissions are put on a bounded in-process queue
+and a background thread group-commits them: it waits for the first message,
+then keeps collecting until CONTACT_BATCH_SIZE rows or CONTACT_FLUSH_MS
+milliseconds, and writes the whole batch in one transaction. That turns a
+burst of N fsyncs into N / batch size.
+
+- A full queue raises QueueFull, which the route turns into a 503.
+- CONTACT_WAIT_DURABLE=1 makes the request block until its batch is committed
+  (still one fsync per batch, not per request).
+- The queue is drained on interpreter shutdown.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import rollups
+from models import db, ContactMessage
+
+ENABLED = os.environ.get('CONTACT_WRITE_BEHIND', '0') == '1'
+QUEUE_SIZE = int(os.environ.get('CONTACT_QUEUE_SIZE', 1000))
+BATCH_SIZE = int(os.environ.get('CONTACT_BATCH_SIZE', 100))
+FLUSH_INTERVAL = int(os.environ.get('CONTACT_FLUSH_MS', 50)) / 1000
+WAIT_DURABLE = os.environ.get('CONTACT_WAIT_DURABLE', '0') == '1'
+WAIT_TIMEOUT = float(os.environ.get('CONTACT_WAIT_TIMEOUT', 5))
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Pending:
+    """Handle for one queued submission."""
+
+    __slots__ = ('fields', 'done', 'error')
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.done = threading.Event()
+        self.error = None
+
+    def wait(self, timeout=None):
+        """Block until the row is committed (or failed); False on timeout."""
+        return self.done.wait(timeout)
+
+
+class WriteBehindQueue:
+    def __init__(self, app, maxsize=QUEUE_SIZE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize)
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Started lazily and per process: threads do not survive gunicorn's fork
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='contact-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, fields):
+        """Queue one ContactMessage's column values; returns a Pending handle."""
+        if self._closed.is_set():
+            raise QueueFull("Ingestion is shutting down")
+        self._ensure_started()
+        fields.setdefault('date', datetime.utcnow())
+        pending = Pending(fields)
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            raise QueueFull("Contact queue is full") from None
+        return pending
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _commit(self, batch):
+        rows = [ContactMessage(**p.fields) for p in batch]
+        rollups.messages_added(rows)
+        db.session.add_all(rows)
+        db.session.commit()
+
+    def _write(self, batch):
+        with self.app.app_context():
+            try:
+                self._commit(batch)
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception("Batch insert of %d messages failed, retrying one by one", len(batch))
+                # Isolate the bad row(s) so one failure does not drop the whole batch
+                for p in batch:
+                    try:
+                        self._commit([p])
+                    except Exception as e:
+                        db.session.rollback()
+                        p.error = e
+        for p in batch:
+            p.done.set()
+
+    def close(self, timeout=10):
+        """Stop accepting submissions and flush whatever is still queued."""
+        self._closed.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
@@ -0,0 +1,229 @@
+"""ASGI entry point: `uvicorn main:app` (see render.yaml).
+
+The public, high-traffic routes (/api/contact, /api/register, /api/login,
+/api/analytics, /predict) are served by async handlers on an async engine
+(aiosqlite for SQLite, asyncpg for Postgres). A database round trip then parks
+a coroutine, not a thread, so one process can keep hundreds of slow clients
+in flight. Every other route (admin, inbox, search, export, metrics) is the
+Flask app from app.py mounted underneath, so both entry points serve the same
+API.
+
+With METRICS_ENABLED=1 the async routes and engine report to the same
+/metrics registry as the Flask app (metrics.init_asgi).
+
+Pool settings: ASYNC_POOL_SIZE, ASYNC_MAX_OVERFLOW, ASYNC_POOL_TIMEOUT,
+ASYNC_POOL_RECYCLE.
+"""
+import asyncio
+import json
+import math
+import os
+import re
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.wsgi import WSGIMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
+
+import billing
+import hashing
+import inference
+import ingest
+import metrics
+import rollups
+import throttle
+from app import app as flask_app, contact_writer, limiter, predictor, DUPLICATE_RESPONSES, PUBLIC_PATHS
+from models import db, ContactMessage, User
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg', 'postgres': 'postgresql+asyncpg'}
+
+
+def async_url(url):
+    """Map the app's (already resolved) sync database URL to its async driver."""
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+with flask_app.app_context():
+    # Flask-SQLAlchemy resolves relative SQLite paths; reuse its final URL
+    engine = create_async_engine(
+        async_url(db.engine.url),
+        pool_size=int(os.environ.get('ASYNC_POOL_SIZE', 20)),
+        max_overflow=int(os.environ.get('ASYNC_MAX_OVERFLOW', 30)),
+        pool_timeout=float(os.environ.get('ASYNC_POOL_TIMEOUT', 10)),
+        pool_recycle=int(os.environ.get('ASYNC_POOL_RECYCLE', 1800)),
+        pool_pre_ping=True,
+    )
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+class PublicCORS:
+    """Wildcard CORS for the public routes only (app.PUBLIC_PATHS), as in app.py."""
+
+    def __init__(self, app):
+        self.app = app
+        self.cors = CORSMiddleware(app, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+        self.public = re.compile(PUBLIC_PATHS)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and self.public.match(scope['path']):
+            return await self.cors(scope, receive, send)
+        return await self.app(scope, receive, send)
+
+
+app = FastAPI(title="AIMatrix Commercial Backend", lifespan=lifespan)
+app.add_middleware(PublicCORS)
+metrics.init_asgi(app, engine, flask_app) # no-op unless METRICS_ENABLED=1
+
+
+def error(message, status):
+    return JSONResponse({"success": False, "error": message}, status_code=status)
+
+
+@app.exception_handler(json.JSONDecodeError)
+async def malformed_json(request, exc):
+    # Same answer as the Flask routes give for an unparseable body
+    return error("Request body must be valid JSON", 400)
+
+
+async def admit(endpoint, request, data):
+    """Run a public write through the limiter (see throttle.py).
+
+    Returns (rejection response or None, dedupe key or None).
+    """
+    if not limiter:
+        return None, None
+    ip = throttle.client_ip(request.client.host if request.client else None,
+                            ','.join(request.headers.getlist('x-forwarded-for')))
+    try:
+        if isinstance(limiter.store, throttle.MemoryStore):
+            return None, limiter.check(endpoint, ip, data)
+        # Other stores do I/O; keep it off the event loop
+        return None, await run_in_threadpool(limiter.check, endpoint, ip, data)
+    except throttle.Limited as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=429,
+                            headers={'Retry-After': str(math.ceil(e.retry_after))}), None
+    except throttle.Duplicate:
+        body, status = DUPLICATE_RESPONSES[endpoint]
+        return JSONResponse(body, status_code=status), None
+
+
+def failed(key, response):
+    # Do not let the dedupe cache swallow the client's retry of a failed write
+    if key:
+        limiter.failed(key)
+    return response
+
+
+@app.post('/api/register')
+async def register(request: Request):
+    data = await request.json()
+    if not isinstance(data, dict):
+        return error("Request body must be a JSON object", 400)
+    rejected, key = await admit('register', request, data)
+    if rejected:
+        return rejected
+    try:
+        hashed_pw = await run_in_threadpool(hashing.hash_password, data['password'])
+    except hashing.HashingBusy as e:
+        return failed(key, error(str(e), 503))
+    async with Session() as session:
+        try:
+            await session.run_sync(lambda s: billing.create_user(
+                data['name'], data['email'], hashed_pw, company=data.get('company', ''), session=s))
+        except billing.EmailTaken as e:
+            return failed(key, error(str(e), 400))
+        except Exception as e:
+            await session.rollback()
+            return failed(key, error(str(e), 500))
+    return {"success": True, "message": "Account created!"}
+
+
+@app.post('/api/login')
+async def login(request: Request):
+    data = await request.json()
+    if not isinstance(data, dict):
+        return error("Request body must be a JSON object", 400)
+    rejected, _ = await admit('login', request, data)
+    if rejected:
+        return rejected
+    async with Session() as session:
+        user = await session.scalar(select(User).where(User.email == data.get('email')))
+    try:
+        # Unknown emails still pay for a hash check (see hashing.py)
+        valid = await run_in_threadpool(
+            hashing.verify_password, user.password if user else None, str(data.get('password') or ''))
+    except hashing.HashingBusy as e:
+        return error(str(e), 503)
+    if not valid:
+        return error("Invalid email or password", 401)
+    # A cache hit is a single primary-key read (see billing.py)
+    async with Session() as session:
+        entitled = await session.run_sync(lambda s: billing.entitlements(user.email, session=s))
+    return {"success": True, "user": {"id": user.id, "name": user.name, "email": user.email, "plan": entitled.plan,
+                                      "paid_orders": entitled.paid_orders}}
+
+
+@app.post('/api/contact')
+async def contact(request: Request):
+    data = await request.json()
+    if not isinstance(data, dict):
+        return error("Request body must be a JSON object", 400)
+    rejected, key = await admit('contact', request, data)
+    if rejected:
+        return rejected
+    fields = {'name': data.get('name'), 'email': data.get('email'), 'message': data.get('message')}
+    if contact_writer:
+        try:
+            pending = contact_writer.submit(fields)
+        except ingest.QueueFull as e:
+            return failed(key, error(str(e), 503))
+        if not ingest.WAIT_DURABLE or not await run_in_threadpool(pending.wait, ingest.WAIT_TIMEOUT):
+            return JSONResponse({'success': True, 'message': 'Queued'}, status_code=202)
+        if pending.error:
+            return failed(key, error(str(pending.error), 500))
+        return {'success': True, 'message': 'Saved'}
+    async with Session() as session:
+        try:
+            new_msg = ContactMessage(**fields)
+            await session.run_sync(lambda s: rollups.messages_added([new_msg], session=s))
+            session.add(new_msg)
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            return failed(key, error(str(e), 500))
+    return {'success': True, 'message': 'Saved'}
+
+
+@app.get('/api/analytics')
+async def analytics():
+    async with Session() as session:
+        total, today, unique = await session.run_sync(lambda s: rollups.snapshot(session=s))
+    return {"success": True, "data": {"submissions": {"total": total, "today": today, "unique_emails": unique}}}
+
+
+@app.post('/predict')
+async def predict(request: Request):
+    try:
+        inputs, single = inference.parse_request(await request.json() or {})
+    except ValueError as e:
+        return error(str(e), 400)
+    try:
+        futures = [asyncio.wrap_future(predictor.submit(item)) for item in inputs]
+        results = await asyncio.wait_for(asyncio.gather(*futures), inference.TIMEOUT)
+    except (inference.Overloaded, asyncio.TimeoutError):
+        return error("Prediction service busy, please retry", 503)
+    return {"success": True, "data": results[0] if single else results}
+
+
+# Everything else: the Flask app, run in the threadpool
+app.mount('/', WSGIMiddleware(flask_app))
@@ -0,0 +1,251 @@
+"""Per-request performance instrumentation, exposed on /metrics.
+
+Enabled with METRICS_ENABLED=1. When disabled nothing is hooked in at all: no
+request callbacks, no SQLAlchemy listeners, so the cost is zero.
+
+Collected per process (each gunicorn worker reports its own numbers):
+- http_request_duration_seconds   latency per endpoint/method/status
+- db_statements_per_request       SQL statements issued per request
+- db_statement_duration_seconds   time per SQL statement, by endpoint
+- db_pool_wait_seconds            time spent acquiring a pooled connection
+- db_slow_queries_total           statements slower than SLOW_QUERY_MS (also logged)
+
+Request latency is recorded when the response is closed, so streamed pages
+and exports include the time (and SQL) spent sending their body.
+
+The ASGI entry point (main.py) is covered by ASGIMetrics plus the same
+engine listeners on its async engine (init_asgi); routes it mounts from the
+Flask app keep being recorded by the Flask hooks.
+
+db_pool_wait_seconds relies on a SQLAlchemy internal (Pool._do_get), as pools
+have no public "checkout requested" event. If a SQLAlchemy upgrade removes
+it, that one metric is skipped with a warning and everything else still works.
+"""
+import contextvars
+import os
+import threading
+import time
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.label_names = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), value=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, labels
+        self.buckets = buckets
+        self._series = {} # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Time to produce and send a response.',
+                            ('endpoint', 'method', 'status'))
+STATEMENTS_PER_REQUEST = Histogram('db_statements_per_request', 'SQL statements issued per request.',
+                                   ('endpoint',), COUNT_BUCKETS)
+STATEMENT_LATENCY = Histogram('db_statement_duration_seconds', 'Time per SQL statement.', ('endpoint',))
+POOL_WAIT = Histogram('db_pool_wait_seconds', 'Time spent acquiring a connection from the pool.')
+SLOW_QUERIES = Counter('db_slow_queries_total', f'SQL statements slower than {SLOW_QUERY_MS:g} ms.', ('endpoint',))
+
+REGISTRY = [REQUEST_LATENCY, STATEMENTS_PER_REQUEST, STATEMENT_LATENCY, POOL_WAIT, SLOW_QUERIES]
+
+STARTED_KEY = 'metrics.started'
+STATEMENTS_KEY = 'metrics.statements'
+
+# Per-request state of async routes; contextvars follow SQLAlchemy's greenlets
+_async_request = contextvars.ContextVar('metrics_async_request', default=None)
+
+
+def _endpoint():
+    if has_request_context():
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+    stats = _async_request.get()
+    if stats is not None:
+        return _route_path(stats['scope']) or 'unmatched'
+    return 'background'
+
+
+def _route_path(scope):
+    route = scope.get('route') # set by FastAPI once the request is routed
+    return route.path if route is not None else None
+
+
+def _instrument_engine(app, engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        endpoint = _endpoint()
+        STATEMENT_LATENCY.observe((endpoint,), elapsed)
+        if has_request_context() and STATEMENTS_KEY in request.environ:
+            request.environ[STATEMENTS_KEY] += 1
+        elif _async_request.get() is not None:
+            _async_request.get()['statements'] += 1
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            SLOW_QUERIES.inc((endpoint,))
+            app.logger.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000, endpoint, statement[:500])
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute; drop its start time
+        starts = context.connection.info.get('query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    # Pools have no "checkout requested" event, so time the pool's own getter
+    # (a SQLAlchemy internal, see the module docstring). Re-applied whenever
+    # the engine swaps in a fresh pool (engine.dispose()).
+    def time_pool(pool):
+        get = getattr(pool, '_do_get', None)
+        if not callable(get):
+            app.logger.warning("%s has no _do_get; db_pool_wait_seconds disabled", type(pool).__name__)
+            return
+
+        def timed_get():
+            started = time.perf_counter()
+            try:
+                return get()
+            finally:
+                POOL_WAIT.observe((), time.perf_counter() - started)
+        pool._do_get = timed_get
+
+    time_pool(engine.pool)
+
+    @event.listens_for(engine, 'engine_disposed')
+    def engine_disposed(engine):
+        time_pool(engine.pool)
+
+
+def init_app(app, db):
+    """Hook the instrumentation into the app and its engine, if enabled."""
+    if not ENABLED:
+        return
+
+    # Kept in the WSGI environ rather than `g`: streamed bodies run in a fresh
+    # app context (stream_with_context), but with the same request
+    @app.before_request
+    def start_timer():
+        request.environ[STARTED_KEY] = time.perf_counter()
+        request.environ[STATEMENTS_KEY] = 0
+
+    @app.after_request
+    def record_request(response):
+        environ = request.environ
+        if STARTED_KEY in environ:
+            labels = (_endpoint(), request.method, response.status_code)
+
+            def record():
+                REQUEST_LATENCY.observe(labels, time.perf_counter() - environ[STARTED_KEY])
+                STATEMENTS_PER_REQUEST.observe(labels[:1], environ[STATEMENTS_KEY])
+            response.call_on_close(record)
+        return response
+
+    with app.app_context():
+        _instrument_engine(app, db.engine)
+
+
+class ASGIMetrics:
+    """ASGI middleware recording request latency and statements for the
+    FastAPI routes. Requests passed on to the mounted Flask app (no
+    scope['route']) are left to its own hooks."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        # Shared with the DB listeners; the route is only known once routed
+        stats = {'scope': scope, 'statements': 0, 'status': 500}
+        token = _async_request.set(stats)
+        started = time.perf_counter()
+
+        async def send_status(message):
+            if message['type'] == 'http.response.start':
+                stats['status'] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            _async_request.reset(token)
+            endpoint = _route_path(scope)
+            if endpoint is not None:
+                REQUEST_LATENCY.observe((endpoint, scope['method'], stats['status']),
+                                        time.perf_counter() - started)
+                STATEMENTS_PER_REQUEST.observe((endpoint,), stats['statements'])
+
+
+def init_asgi(asgi_app, engine, app):
+    """Instrument the ASGI app and its async engine, if enabled; `app` (the
+    Flask app) provides the logger for slow queries."""
+    if not ENABLED:
+        return
+    _instrument_engine(app, engine.sync_engine)
+    asgi_app.add_middleware(ASGIMetrics)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
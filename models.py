@@ -4,13 +4,29 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+class ContactMessage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100))
+    email = db.Column(db.String(100), index=True) # Indexed for unique-sender checks
+    message = db.Column(db.Text)
+    date = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default='Unread')
+
+    __table_args__ = (
+        db.Index('ix_contact_message_date_id', 'date', 'id'), # Keyset pagination, date ranges and time series
+        db.Index('ix_contact_message_status_date', 'status', 'date'), # Status-filtered / unread-first views
+        # Never hand out an id again once its row is archived (archived_message keeps it)
+        {'sqlite_autoincrement': True},
+    )
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(150), unique=True, nullable=False)
-    password = db.Column(db.String(150), nullable=False)
+    password = db.Column(db.String(200), nullable=False) # Stores hashed password
     name = db.Column(db.String(150))
+    company = db.Column(db.String(100))
     plan_type = db.Column(db.String(50), default='free') # free, starter, growth
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True) # Signup time series
 
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -18,3 +34,32 @@ class Order(db.Model):
     user_email = db.Column(db.String(150))
     amount = db.Column(db.Integer)
     status = db.Column(db.String(50)) # pending, paid
+
+    __table_args__ = (
+        db.Index('ix_order_user_email_status', 'user_email', 'status'), # A user's (paid) orders, see billing.py
+    )
+
+class RollupCounter(db.Model):
+    # Pre-aggregated analytics counters, kept in step with the raw tables (see rollups.py)
+    name = db.Column(db.String(64), primary_key=True) # e.g. messages.total, messages.day:2024-01-31
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class RollupSender(db.Model):
+    # Messages per sender; a sender counts towards unique_emails while messages > 0
+    email = db.Column(db.String(150), primary_key=True) # '' stands in for a missing email
+    messages = db.Column(db.Integer, nullable=False, default=0)
+
+class RollupSketch(db.Model):
+    # Per-day HyperLogLog of sender emails (see hll.py) for approximate unique counts over date ranges
+    day = db.Column(db.Date, primary_key=True)
+    registers = db.Column(db.LargeBinary, nullable=False)
+
+class ArchivedMessage(db.Model):
+    # Cold tier of contact_message (see retention.py); rows keep their original id
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100))
+    email = db.Column(db.String(100))
+    message = db.Column(db.Text)
+    date = db.Column(db.DateTime, index=True)
+    status = db.Column(db.String(20))
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,119 @@
+"""Hot/cold retention tiering for contact messages.
+
+Messages older than RETENTION_DAYS are moved from contact_message to
+archived_message, so the inbox listing, bulk actions and deletes only ever
+scan recent rows. Archived rows keep their id and columns; they stay
+searchable (search.search(archive=True)), exportable (/api/export/
+archived_messages) and counted by the analytics rollups and time series.
+
+Compaction moves RETENTION_BATCH_SIZE rows per transaction (INSERT ... SELECT
+then DELETE by id) and sleeps RETENTION_PAUSE_MS between batches, so the
+write lock is only ever held for one small batch and request traffic
+interleaves with a long backlog. Run it with `flask compact-messages`
+(e.g. from cron), or set RETENTION_INTERVAL to a number of seconds to run it
+in a background thread of every app process. Concurrent runs are safe: on
+Postgres they skip each other's locked rows, elsewhere a clashing batch is
+rolled back and picked up again by the next pass.
+
+RETENTION_DAYS=0 disables compaction.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select
+
+from models import db, ContactMessage, ArchivedMessage
+
+RETENTION_DAYS = int(os.environ.get('RETENTION_DAYS', 180))
+BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 500))
+PAUSE = int(os.environ.get('RETENTION_PAUSE_MS', 50)) / 1000
+INTERVAL = int(os.environ.get('RETENTION_INTERVAL', 0))
+
+COLUMNS = ['id', 'name', 'email', 'message', 'date', 'status']
+
+
+def cutoff(days=None, now=None):
+    """Messages dated before this belong in the archive; None if disabled."""
+    days = RETENTION_DAYS if days is None else days
+    if days <= 0:
+        return None
+    return (now or datetime.utcnow()) - timedelta(days=days)
+
+
+def due(before):
+    """Number of hot messages older than `before`."""
+    return db.session.query(func.count(ContactMessage.id)).filter(ContactMessage.date < before).scalar()
+
+
+def compact_batch(before, batch_size=BATCH_SIZE):
+    """Move up to `batch_size` of the oldest messages dated before `before`
+    into the archive, in one transaction. Returns the number moved."""
+    ids = db.session.scalars(
+        select(ContactMessage.id).where(ContactMessage.date < before)
+        .order_by(ContactMessage.date, ContactMessage.id).limit(batch_size)
+        .with_for_update(skip_locked=True)).all()
+    if not ids:
+        db.session.rollback()
+        return 0
+    archived_at = literal(datetime.utcnow(), ArchivedMessage.archived_at.type)
+    db.session.execute(insert(ArchivedMessage).from_select(
+        COLUMNS + ['archived_at'],
+        select(*[getattr(ContactMessage, c) for c in COLUMNS], archived_at).where(ContactMessage.id.in_(ids))))
+    # Rollup counters are left alone: archived messages still count
+    db.session.execute(delete(ContactMessage).where(ContactMessage.id.in_(ids))
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+    return len(ids)
+
+
+def compact(before=None, batch_size=BATCH_SIZE, max_batches=None, pause=PAUSE):
+    """Archive everything older than `before` (default: cutoff()) batch by
+    batch. Returns the number of messages moved."""
+    before = before or cutoff()
+    if before is None:
+        return 0
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = compact_batch(before, batch_size)
+        moved += count
+        batches += 1
+        if count < batch_size:
+            break
+        time.sleep(pause)
+    return moved
+
+
+class Compactor:
+    """Runs compact() every `interval` seconds in a daemon thread."""
+
+    def __init__(self, app, interval=INTERVAL):
+        self.app = app
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def ensure_started(self):
+        # Started lazily and per process: threads do not survive gunicorn's fork
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='retention-compactor', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self.app.app_context():
+                try:
+                    moved = compact()
+                    if moved:
+                        self.app.logger.info("Archived %d messages", moved)
+                except Exception:
+                    # e.g. another process archived the same rows; retry next pass
+                    db.session.rollback()
+                    self.app.logger.exception("Retention pass failed")
+            time.sleep(self.interval)
@@ -0,0 +1,293 @@
+"""Incrementally maintained counters behind /api/analytics.
+
+Besides the message counters there is one per-day signup counter
+(users.day:YYYY-MM-DD, see users_added()); day and week buckets of
+/api/analytics/timeseries are read straight from the per-day counters.
+
+Writers call messages_added() / messages_deleted() inside the same transaction
+as the rows they describe, so the counters commit or roll back together with
+them. Reads are a primary-key lookup of a handful of rows instead of a scan of
+contact_message. rebuild() recomputes everything from the raw table if the two
+ever drift apart. Messages moved to the retention archive (retention.py) are
+still counted; only deletes change the counters.
+
+For unique senders over arbitrary date ranges there is also a per-day
+HyperLogLog sketch (rollup_sketch, see hll.py): merging the sketches of the
+days in a range estimates its distinct senders without reading messages.
+
+Unique senders are tracked with a per-email message count (rollup_sender).
+Every change goes through an atomic upsert first, which row-locks the senders
+involved, and only then reads them back. Concurrent writers touching the same
+sender therefore serialize, and a sender is counted exactly once however many
+requests race on it.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import func, or_, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+import hll
+from models import db, ContactMessage, ArchivedMessage, RollupCounter, RollupSender, RollupSketch, User
+
+TOTAL = 'messages.total'
+UNIQUE_EMAILS = 'messages.unique_emails'
+DAY_PREFIX = 'messages.day:'
+SIGNUP_DAY_PREFIX = 'users.day:'
+
+# Counter families owned by this module (rebuild() rewrites these)
+_FAMILIES = ('messages.%', 'users.%')
+
+# Keeps IN (...) lists well below SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+
+def day_key(day):
+    return DAY_PREFIX + day.isoformat()
+
+
+def signup_day_key(day):
+    return SIGNUP_DAY_PREFIX + day.isoformat()
+
+
+def _sender_key(email):
+    return email if email is not None else ''
+
+
+def _upsert(session, model):
+    """Dialect-specific INSERT supporting ON CONFLICT, or None if unavailable."""
+    dialect = session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(model)
+    if dialect == 'postgresql':
+        return postgresql.insert(model)
+    return None
+
+
+def _add_to(session, model, key, value, deltas):
+    """Atomically add each {key: delta} to `model.value`, creating missing rows."""
+    deltas = {k: d for k, d in deltas.items() if d}
+    if not deltas:
+        return
+    stmt = _upsert(session, model)
+    if stmt is not None:
+        stmt = stmt.on_conflict_do_update(index_elements=[key], set_={value.key: value + stmt.excluded[value.key]})
+        session.execute(stmt, [{key.key: k, value.key: d} for k, d in deltas.items()])
+        return
+    # Generic fallback: lock the rows we touch and rely on the transaction
+    for k, d in deltas.items():
+        row = session.query(model).filter(key == k).with_for_update().first()
+        if row is None:
+            session.add(model(**{key.key: k, value.key: d}))
+        else:
+            setattr(row, value.key, getattr(row, value.key) + d)
+    session.flush()
+
+
+def _bump(session, deltas):
+    _add_to(session, RollupCounter, RollupCounter.name, RollupCounter.value, deltas)
+
+
+def increment(name, session=None):
+    """Atomically add 1 to the counter `name` in the current transaction."""
+    _bump(db.session if session is None else session, {name: 1})
+
+
+def _sender_counts(session, emails):
+    counts = {}
+    emails = list(emails)
+    for i in range(0, len(emails), _IN_CHUNK):
+        rows = session.query(RollupSender.email, RollupSender.messages) \
+            .filter(RollupSender.email.in_(emails[i:i + _IN_CHUNK]))
+        counts.update(rows)
+    return counts
+
+
+def _deltas(messages, sign):
+    deltas = {TOTAL: sign * len(messages)}
+    senders = {}
+    for msg in messages:
+        key = day_key(msg.date.date())
+        deltas[key] = deltas.get(key, 0) + sign
+        email = _sender_key(msg.email)
+        senders[email] = senders.get(email, 0) + sign
+    return deltas, senders
+
+
+def messages_added(messages, session=None):
+    """Account for new ContactMessage rows in the current transaction.
+
+    `session` defaults to the Flask-SQLAlchemy session; the ASGI app passes
+    its own (see main.py).
+    """
+    if not messages:
+        return
+    session = db.session if session is None else session
+    for msg in messages:
+        if msg.date is None:
+            msg.date = datetime.utcnow()
+    deltas, senders = _deltas(messages, 1)
+    with session.no_autoflush:
+        _add_to(session, RollupSender, RollupSender.email, RollupSender.messages, senders)
+        after = _sender_counts(session, senders)
+        # A sender is new if its count now equals what this batch added
+        deltas[UNIQUE_EMAILS] = sum(1 for email, added in senders.items() if after.get(email) == added)
+        _bump(session, deltas)
+        _sketch(session, messages)
+
+
+def messages_deleted(messages, session=None):
+    """Account for deleted rows in the current transaction.
+
+    `messages` can be ORM objects or plain rows; only `.date` and `.email` are read.
+    """
+    if not messages:
+        return
+    session = db.session if session is None else session
+    deltas, senders = _deltas(messages, -1)
+    _add_to(session, RollupSender, RollupSender.email, RollupSender.messages, senders)
+    gone = [email for email, count in _sender_counts(session, senders).items() if count <= 0]
+    for i in range(0, len(gone), _IN_CHUNK):
+        session.query(RollupSender).filter(RollupSender.email.in_(gone[i:i + _IN_CHUNK])) \
+            .delete(synchronize_session=False)
+    deltas[UNIQUE_EMAILS] = -len(gone)
+    _bump(session, deltas)
+
+
+def users_added(users, session=None):
+    """Account for new User rows in the current transaction."""
+    if not users:
+        return
+    session = db.session if session is None else session
+    deltas = {}
+    for user in users:
+        if user.created_at is None:
+            user.created_at = datetime.utcnow()
+        key = signup_day_key(user.created_at.date())
+        deltas[key] = deltas.get(key, 0) + 1
+    with session.no_autoflush:
+        _bump(session, deltas)
+
+
+def day_counts(prefix, first, last, session=None):
+    """{date: count} from the per-day counters with `prefix` for days in [first, last).
+
+    ISO dates sort as strings, so this is a primary-key range scan.
+    """
+    session = db.session if session is None else session
+    rows = session.query(RollupCounter.name, RollupCounter.value) \
+        .filter(RollupCounter.name >= prefix + first.isoformat(), RollupCounter.name < prefix + last.isoformat())
+    return {date.fromisoformat(name[len(prefix):]): value for name, value in rows}
+
+
+def _all_messages():
+    """(date, email) of every message, hot and archived."""
+    return union_all(
+        select(ContactMessage.date, ContactMessage.email),
+        select(ArchivedMessage.date, ArchivedMessage.email),
+    ).subquery()
+
+
+def _sketch(session, messages):
+    """Fold the senders of new messages into their day's HyperLogLog."""
+    by_day = {}
+    for msg in messages:
+        by_day.setdefault(msg.date.date(), set()).add(_sender_key(msg.email))
+    for day, emails in by_day.items():
+        stmt = _upsert(session, RollupSketch)
+        if stmt is not None:
+            session.execute(stmt.values(day=day, registers=hll.EMPTY).on_conflict_do_nothing())
+        # Row lock (Postgres) / write lock (SQLite) makes the read-modify-write safe
+        row = session.query(RollupSketch).filter_by(day=day).with_for_update().populate_existing().first()
+        if row is None:
+            row = RollupSketch(day=day, registers=hll.EMPTY)
+            session.add(row)
+        registers = bytearray(row.registers)
+        for email in emails:
+            hll.add(registers, email)
+        row.registers = bytes(registers)
+
+
+def unique_senders(start, end, session=None):
+    """Approximate distinct senders for days in [start, end) from the sketches.
+
+    Days are whole UTC days; messages deleted later are still counted, as a
+    sketch cannot forget. Relative standard error is hll.STANDARD_ERROR.
+    """
+    session = db.session if session is None else session
+    blobs = session.query(RollupSketch.registers).filter(RollupSketch.day >= start, RollupSketch.day < end)
+    return hll.estimate(hll.merge(blob for (blob,) in blobs))
+
+
+def exact_unique_senders(start, end):
+    """Exact distinct senders for messages (including archived ones) dated in [start, end)."""
+    messages = _all_messages()
+    return db.session.query(func.count(func.distinct(func.coalesce(messages.c.email, '')))) \
+        .filter(messages.c.date >= start, messages.c.date < end).scalar()
+
+
+def rebuild_sketches(batch_size=10000):
+    """Recompute every day's sketch from the messages; returns the number of days."""
+    sketches = {}
+    messages = _all_messages()
+    rows = db.session.query(messages.c.date, messages.c.email).yield_per(batch_size)
+    for when, email in rows:
+        hll.add(sketches.setdefault(when.date(), bytearray(hll.M)), _sender_key(email))
+    RollupSketch.query.delete(synchronize_session=False)
+    db.session.add_all(RollupSketch(day=day, registers=bytes(regs)) for day, regs in sketches.items())
+    db.session.commit()
+    return len(sketches)
+
+
+def snapshot(today=None, session=None):
+    """Return (total, today, unique_emails) from the counters table."""
+    session = db.session if session is None else session
+    today = today or datetime.utcnow().date()
+    names = [TOTAL, UNIQUE_EMAILS, day_key(today)]
+    values = dict(session.query(RollupCounter.name, RollupCounter.value).filter(RollupCounter.name.in_(names)))
+    return values.get(TOTAL, 0), values.get(day_key(today), 0), values.get(UNIQUE_EMAILS, 0)
+
+
+def compute():
+    """Recompute every message and signup counter, and the per-sender counts, from the raw tables."""
+    messages = _all_messages()
+    sender = func.coalesce(messages.c.email, '')
+    senders = dict(db.session.query(sender, func.count()).group_by(sender))
+    counts = {
+        TOTAL: sum(senders.values()),
+        UNIQUE_EMAILS: len(senders),
+    }
+    per_day = db.session.query(func.date(messages.c.date), func.count()).group_by(func.date(messages.c.date))
+    for day, count in per_day:
+        # SQLite returns 'YYYY-MM-DD' strings, Postgres returns date objects
+        counts[DAY_PREFIX + str(day)] = count
+    signups = db.session.query(func.date(User.created_at), func.count(User.id)) \
+        .filter(User.created_at.isnot(None)).group_by(func.date(User.created_at))
+    for day, count in signups:
+        counts[SIGNUP_DAY_PREFIX + str(day)] = count
+    return counts, senders
+
+
+def rebuild(dry_run=False):
+    """Reconcile the counters with the raw table.
+
+    Returns {name: (stored, actual)} for every counter that had drifted
+    ('messages.senders' compares the per-sender table as a whole). With
+    dry_run nothing is written.
+    """
+    actual, senders = compute()
+    owned = or_(*[RollupCounter.name.like(family) for family in _FAMILIES])
+    stored = dict(db.session.query(RollupCounter.name, RollupCounter.value).filter(owned))
+    drift = {}
+    for name in set(actual) | set(stored):
+        if stored.get(name, 0) != actual.get(name, 0):
+            drift[name] = (stored.get(name, 0), actual.get(name, 0))
+    stored_senders = dict(db.session.query(RollupSender.email, RollupSender.messages))
+    if stored_senders != senders:
+        drift['messages.senders'] = (len(stored_senders), len(senders))
+    if not dry_run and drift:
+        RollupCounter.query.filter(owned).delete(synchronize_session=False)
+        RollupSender.query.delete(synchronize_session=False)
+        db.session.add_all(RollupCounter(name=name, value=value) for name, value in actual.items() if value)
+        db.session.add_all(RollupSender(email=email, messages=count) for email, count in senders.items())
+        db.session.commit()
+    return drift
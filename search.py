@@ -0,0 +1,137 @@
+"""Full-text search over contact messages.
+
+SQLite: an external-content FTS5 table (contact_message_fts) mirrors name,
+email and message, kept in sync by triggers on contact_message so every write
+path (ORM, bulk statements, archiving) updates it in the same transaction.
+
+Postgres: a GIN expression index over to_tsvector(name || email || message).
+The index is maintained by Postgres itself; queries repeat the exact same
+expression so the planner can use it. It is built once by `flask
+backfill-search` with CREATE INDEX CONCURRENTLY, so writes keep flowing while
+a large table is indexed; until then search works, just without the index.
+
+Any other backend falls back to the ILIKE filter used by the inbox.
+
+The retention archive (archived_message, see retention.py) gets the same
+structures under its own name and is searched with archive=True.
+"""
+import re
+
+from sqlalchemy import text
+
+import inbox
+from models import db, ContactMessage, ArchivedMessage
+
+PG_VECTOR = ("to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(email, '') || ' ' || "
+             "coalesce(message, ''))")
+
+TABLES = [ContactMessage.__tablename__, ArchivedMessage.__tablename__]
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+        name, email, message, content='{table}', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts(rowid, name, email, message)
+        VALUES (new.id, new.name, new.email, new.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, name, email, message)
+        VALUES ('delete', old.id, old.name, old.email, old.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF name, email, message ON {table} BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, name, email, message)
+        VALUES ('delete', old.id, old.name, old.email, old.message);
+        INSERT INTO {table}_fts(rowid, name, email, message)
+        VALUES (new.id, new.name, new.email, new.message);
+    END""",
+]
+
+PG_INDEX = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{{table}}_fts ON {{table}} USING GIN ({PG_VECTOR})"
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def install():
+    """Create the SQLite index tables and triggers if missing. Safe to call on
+    every start; the Postgres index is left to backfill()."""
+    if _dialect() != 'sqlite':
+        return
+    for table in TABLES:
+        for statement in SQLITE_DDL:
+            db.session.execute(text(statement.format(table=table)))
+    db.session.commit()
+
+
+def _build_pg_index(table):
+    # CONCURRENTLY cannot run inside a transaction block
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        # An interrupted concurrent build leaves an INVALID index behind, which
+        # IF NOT EXISTS would keep; drop it and start over
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(:name) AND NOT indisvalid"
+        ), {'name': f'ix_{table}_fts'}).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY ix_{table}_fts"))
+        conn.execute(text(PG_INDEX.format(table=table)))
+
+
+def backfill():
+    """Index every existing row, e.g. after enabling search on an old database."""
+    dialect = _dialect()
+    install()
+    for table in TABLES:
+        if dialect == 'sqlite':
+            db.session.execute(text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+        elif dialect == 'postgresql':
+            # An expression index covers the existing rows as soon as it exists
+            _build_pg_index(table)
+    db.session.commit()
+
+
+def _fts5_query(q):
+    # Quote every term so user input can never be parsed as FTS5 syntax;
+    # the trailing * gives prefix matching for search-as-you-type.
+    terms = re.findall(r'\w+', q)
+    return ' '.join(f'"{t}"*' for t in terms)
+
+
+def search(q, page=1, limit=None, archive=False):
+    """Return (hits, has_more) where hits is a list of (message, rank), best first.
+
+    With archive=True the retention archive is searched instead of the inbox.
+    """
+    size = inbox.page_size(limit)
+    page = max(1, int(page or 1))
+    offset = (page - 1) * size
+    dialect = _dialect()
+    model = ArchivedMessage if archive else ContactMessage
+    table = model.__tablename__
+
+    if dialect == 'sqlite':
+        match = _fts5_query(q)
+        if not match:
+            return [], False
+        rows = db.session.execute(text(
+            f"SELECT rowid, bm25({table}_fts) AS rank FROM {table}_fts "
+            f"WHERE {table}_fts MATCH :q ORDER BY rank, rowid DESC LIMIT :limit OFFSET :offset"
+        ), {'q': match, 'limit': size + 1, 'offset': offset}).all()
+        # bm25() is "lower is better"; flip it so callers always sort descending
+        ranked = [(row[0], -row[1]) for row in rows]
+    elif dialect == 'postgresql':
+        rows = db.session.execute(text(
+            f"SELECT id, ts_rank({PG_VECTOR}, query) AS rank "
+            f"FROM {table}, plainto_tsquery('simple', :q) AS query "
+            f"WHERE {PG_VECTOR} @@ query ORDER BY rank DESC, id DESC LIMIT :limit OFFSET :offset"
+        ), {'q': q, 'limit': size + 1, 'offset': offset}).all()
+        ranked = [(row[0], row[1]) for row in rows]
+    else:
+        messages = inbox.filtered(q=q, model=model).offset(offset).limit(size + 1).all()
+        ranked = [(m.id, None) for m in messages]
+
+    has_more = len(ranked) > size
+    ranked = ranked[:size]
+    by_id = {m.id: m for m in model.query.filter(model.id.in_([i for i, _ in ranked]))}
+    hits = [(by_id[i], rank) for i, rank in ranked if i in by_id]
+    return hits, has_more
@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Configure before app.py is imported: it reads the environment at import time
+_tmp = tempfile.mkdtemp(prefix='aimatrix-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{_tmp}/test.db'
+os.environ['HASH_WORKERS'] = '0'
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+
+
+@pytest.fixture
+def app():
+    from app import app
+    from models import db
+    yield app
+    with app.app_context():
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    """Set ADMIN_TOKEN; returns the headers that authenticate with it."""
+    monkeypatch.setattr('app.ADMIN_TOKEN', 'secret')
+    return {'Authorization': 'Bearer secret'}
@@ -0,0 +1,67 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import billing
+import metrics
+
+
+@pytest.fixture
+def asgi(app):
+    import main
+    return main
+
+
+@pytest.fixture
+def client(asgi):
+    return TestClient(asgi.app)
+
+
+@pytest.mark.parametrize('path', ['/api/register', '/api/login', '/api/contact', '/predict'])
+def test_malformed_json_is_a_400(client, path):
+    res = client.post(path, content=b'{not json', headers={'Content-Type': 'application/json'})
+    assert res.status_code == 400
+    assert res.json()['success'] is False
+
+
+@pytest.mark.parametrize('path', ['/api/register', '/api/login', '/api/contact', '/predict'])
+@pytest.mark.parametrize('body', [[], 'text', 1])
+def test_non_object_json_is_a_400(client, path, body):
+    res = client.post(path, json=body)
+    assert res.status_code == 400
+    assert res.json()['success'] is False
+
+
+@pytest.mark.parametrize('path', ['/api/register', '/api/contact'])
+def test_non_object_json_is_a_400_on_flask_too(app, path):
+    res = app.test_client().post(path, json=[])
+    assert res.status_code == 400
+    assert res.json['success'] is False
+
+
+def test_register_and_login_share_the_billing_paths(client):
+    user = {'name': 'A', 'email': 'a@x.com', 'password': 'pw'}
+    assert client.post('/api/register', json=user).json()['success']
+    res = client.post('/api/register', json=dict(user, name='Other'))
+    assert res.status_code == 400 and res.json()['error'] == 'Email already registered'
+
+    billing.cache.invalidate('a@x.com')
+    assert client.post('/api/login', json=user).json()['user']['plan'] == 'free'
+    assert billing.cache.get('a@x.com') is not None
+
+
+def test_async_routes_are_instrumented(asgi, app, monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', True)
+    engine = asgi.engine.sync_engine
+    metrics._instrument_engine(app, engine)
+    client = TestClient(metrics.ASGIMetrics(asgi.app))
+    res = client.post('/api/contact', json={'name': 'A', 'email': 'm@x.com', 'message': 'hi'})
+    assert res.status_code == 200
+
+    latency = metrics.REQUEST_LATENCY._series.get(('/api/contact', 'POST', 200))
+    assert latency and latency[-1] >= 1
+    statements = metrics.STATEMENTS_PER_REQUEST._series.get(('/api/contact',))
+    assert statements and statements[-2] > 0
+    assert metrics.STATEMENT_LATENCY._series.get(('/api/contact',))
+    # Requests served by the mounted Flask app are left to its own hooks
+    client.get('/')
+    assert not any(labels[0] == '/' for labels in metrics.REQUEST_LATENCY._series)
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import update
+
+import billing
+import rollups
+from models import db, Order
+
+
+@pytest.fixture
+def customer(ctx, monkeypatch):
+    monkeypatch.setattr(billing, 'cache', billing.TTLCache())
+    billing.create_user('Ann', 'ann@x.com', 'hash')
+    db.session.add(Order(order_id='order_1', user_email='ann@x.com', amount=500, status='pending'))
+    db.session.commit()
+    return 'ann@x.com'
+
+
+def flip_paid_elsewhere(order_id):
+    """What another process's mark_paid() leaves behind: new rows and a new
+    generation, but this process's cache untouched."""
+    db.session.execute(update(Order).where(Order.order_id == order_id).values(status=billing.PAID))
+    rollups.increment(billing.GENERATION)
+    db.session.commit()
+
+
+def test_entitlements_are_cached(customer):
+    assert billing.entitlements(customer) == ('free', 0, 0)
+    db.session.execute(update(Order).values(status=billing.PAID)) # without a generation bump
+    db.session.commit()
+    assert billing.entitlements(customer) == ('free', 0, 0)
+    assert billing.entitlements('nobody@x.com') is None
+
+
+def test_a_paid_flip_in_another_process_invalidates(customer):
+    assert billing.entitlements(customer).paid_orders == 0
+    flip_paid_elsewhere('order_1')
+    assert billing.entitlements(customer) == ('free', 1, 500)
+
+
+def test_mark_paid_and_set_plan_invalidate(customer):
+    assert billing.entitlements(customer).plan == 'free'
+    billing.mark_paid('order_1', plan='growth')
+    assert billing.entitlements(customer) == ('growth', 1, 500)
+    assert billing.set_plan(customer, 'starter')
+    assert billing.entitlements(customer).plan == 'starter'
+    assert billing.mark_paid('missing') is None
+    with pytest.raises(ValueError):
+        billing.set_plan(customer, 'platinum')
+
+
+def test_ttl_cache_expires_and_evicts(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(billing, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    cache = billing.TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1 # now most recently used
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    now[0] = 61
+    assert cache.get('a') is None
+    cache.set('a', 1)
+    cache.invalidate('a')
+    assert cache.get('a') is None
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pytest
+
+import export
+
+
+def test_parse_bound_converts_offsets_to_naive_utc():
+    assert export.parse_bound('2026-10-01T02:00:00+02:00') == datetime(2026, 10, 1, 0, 0)
+    assert export.parse_bound('2026-10-20', end=True) == datetime(2026, 10, 21)
+    with pytest.raises(ValueError):
+        export.parse_bound('yesterday')
+
+
+@pytest.mark.parametrize('path', ['/api/analytics/unique', '/api/analytics/timeseries'])
+def test_aware_bounds_do_not_500(client, path):
+    res = client.get(path + '?from=2026-10-01T00:00:00%2B00:00&to=2026-10-20')
+    assert res.status_code == 200
+
+
+def test_export_is_not_cross_origin(client):
+    res = client.get('/api/export/users', headers={'Origin': 'https://evil.example'})
+    assert 'Access-Control-Allow-Origin' not in res.headers
+    res = client.post('/api/contact', json={'name': 'a', 'email': 'a@x.com', 'message': 'hi'},
+                      headers={'Origin': 'https://site.example'})
+    assert 'Access-Control-Allow-Origin' in res.headers
+
+
+def test_export_is_disabled_without_admin_token(client):
+    assert client.get('/api/export/users').status_code == 403
+
+
+def test_export_requires_admin_token(client, admin):
+    assert client.get('/api/export/users').status_code == 401
+    res = client.get('/api/export/users', headers=admin)
+    assert res.status_code == 200
+    assert client.get('/admin/login?token=wrong').status_code == 401
+    assert client.get('/admin/login?token=secret').status_code == 302
+    assert client.get('/api/export/users').status_code == 200
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import hll
+import rollups
+from models import db, ContactMessage
+
+
+def sketch(values):
+    registers = bytearray(hll.M)
+    for value in values:
+        hll.add(registers, value)
+    return bytes(registers)
+
+
+def test_estimate_is_within_the_error_bound():
+    for n in (100, 5000, 50000):
+        estimate = hll.estimate(sketch(f'user{i}@x.com' for i in range(n)))
+        assert abs(estimate - n) <= 3 * hll.STANDARD_ERROR * n, (n, estimate)
+
+
+def test_small_counts_are_exact_and_repeats_ignored():
+    assert hll.estimate(hll.EMPTY) == 0
+    assert hll.estimate(sketch(['a', 'b', 'c', 'a', 'b'])) == 3
+
+
+def test_merge_estimates_the_union():
+    monday = sketch(f'u{i}' for i in range(0, 3000))
+    tuesday = sketch(f'u{i}' for i in range(2000, 5000))
+    union = hll.estimate(hll.merge([monday, tuesday]))
+    assert abs(union - 5000) <= 3 * hll.STANDARD_ERROR * 5000
+    assert hll.estimate(hll.merge([monday, monday])) == hll.estimate(monday)
+
+
+def test_unique_endpoint_approximate_and_exact(client, ctx):
+    for i, email in enumerate(['a@x.com', 'b@x.com', 'a@x.com', 'c@x.com']):
+        msg = ContactMessage(name='T', email=email, message=str(i), date=datetime(2024, 3, 4 + i))
+        rollups.messages_added([msg])
+        db.session.add(msg)
+    db.session.commit()
+
+    query = '/api/analytics/unique?from=2024-03-04&to=2024-03-06' # 'to' dates are inclusive
+    approx = client.get(query).json['data']
+    assert (approx['unique_emails'], approx['approximate']) == (2, True)
+    assert approx['standard_error'] == round(hll.STANDARD_ERROR, 4)
+    exact = client.get(query + '&exact=true').json['data']
+    assert (exact['unique_emails'], exact['approximate'], exact['standard_error']) == (2, False, 0)
+    assert client.get('/api/analytics/unique?from=2024-03-04&to=2024-03-07').json['data']['unique_emails'] == 3
@@ -0,0 +1,64 @@
+import html
+import re
+
+import pytest
+
+import inbox
+from models import ContactMessage
+
+
+@pytest.fixture
+def messages(client, ctx):
+    for i in range(3):
+        client.post('/api/contact', json={'name': 'T', 'email': f'u{i}@x.com', 'message': f'm{i}'})
+    return [m.id for m in ContactMessage.query.order_by(ContactMessage.id)]
+
+
+@pytest.mark.parametrize('ids', ['12', [1, '2'], [True], {'1': 1}, 5])
+def test_bulk_rejects_anything_but_a_list_of_ints(client, messages, admin, ids):
+    res = client.post('/api/messages/bulk', json={'action': 'delete', 'ids': ids}, headers=admin)
+    assert res.status_code == 400
+    assert ContactMessage.query.count() == 3
+
+
+@pytest.mark.parametrize('body', [[], 'x', {'action': 'read', 'filter': 'x'}, {'action': 'delete', 'filter': [1]},
+                                  {'action': 'delete', 'filter': {'q': ['@']}}])
+def test_bulk_rejects_malformed_bodies(client, messages, admin, body):
+    res = client.post('/api/messages/bulk', json=body, headers=admin)
+    assert res.status_code == 400
+    assert res.json['success'] is False
+    assert ContactMessage.query.count() == 3
+
+
+def test_bulk_deletes_selected_ids(client, messages, admin):
+    res = client.post('/api/messages/bulk', json={'action': 'delete', 'ids': messages[:2]}, headers=admin)
+    assert res.json['data']['affected'] == 2
+    assert [m.id for m in ContactMessage.query] == messages[2:]
+
+
+def test_bulk_needs_a_selector(ctx):
+    with pytest.raises(ValueError):
+        inbox.bulk('delete')
+
+
+def test_bulk_requires_admin_token(client, messages, admin):
+    body = {'action': 'delete', 'filter': {'q': '@'}}
+    assert client.post('/api/messages/bulk', json=body).status_code == 401
+    assert ContactMessage.query.count() == 3
+    res = client.post('/api/messages/bulk', json=body, headers=admin)
+    assert res.json['data']['affected'] == 3
+
+
+def test_bulk_is_disabled_without_admin_token(client, messages):
+    res = client.post('/api/messages/bulk', json={'action': 'delete', 'filter': {'q': '@'}})
+    assert res.status_code == 403
+    assert ContactMessage.query.count() == 3
+
+
+def test_inbox_never_puts_messages_in_inline_script(client, ctx):
+    payload = "x'); fetch('/api/messages/bulk'); ('"
+    client.post('/api/contact', json={'name': payload, 'email': 'a@x.com', 'message': payload})
+    page = client.get('/admin').get_data(as_text=True)
+    handlers = [html.unescape(v) for v in re.findall(r'\son\w+="([^"]*)"', page)]
+    assert handlers and not any('fetch' in h for h in handlers)
+    assert payload in [html.unescape(v) for v in re.findall(r'data-message="([^"]*)"', page)]
@@ -0,0 +1,27 @@
+import pytest
+
+import inference
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'text', 3])
+def test_parse_request_rejects_non_objects(body):
+    with pytest.raises(ValueError):
+        inference.parse_request(body)
+
+
+def test_predict_rejects_non_object_body(client):
+    res = client.post('/predict', json=[1, 2])
+    assert res.status_code == 400
+    assert res.json['success'] is False
+
+
+def test_predict_single_and_batch(client):
+    res = client.post('/predict', json={'text': 'How much is the growth plan?'})
+    assert res.status_code == 200
+    res = client.post('/predict', json={'inputs': ['pricing please', 'login is broken']})
+    assert len(res.json['data']) == 2
+
+
+def test_model_interface_is_abstract():
+    with pytest.raises(TypeError):
+        inference.Model()
@@ -0,0 +1,65 @@
+import pytest
+
+import ingest
+import rollups
+from models import ContactMessage
+
+
+@pytest.fixture
+def writer(app):
+    queue = ingest.WriteBehindQueue(app, maxsize=10, batch_size=10, flush_interval=0.2)
+    yield queue
+    queue.close()
+
+
+def fields(i):
+    return {'name': 'Test', 'email': f'u{i}@x.com', 'message': f'm{i}'}
+
+
+def test_submissions_are_committed_in_one_batch(writer, ctx, monkeypatch):
+    batches = []
+    commit = writer._commit
+    monkeypatch.setattr(writer, '_commit', lambda batch: (batches.append(len(batch)), commit(batch)))
+    pending = [writer.submit(fields(i)) for i in range(5)]
+    assert all(p.wait(5) for p in pending)
+    assert batches == [5]
+    assert ContactMessage.query.count() == 5
+    assert rollups.snapshot()[0] == 5
+
+
+def test_a_bad_row_is_retried_alone(writer, ctx):
+    pending = [writer.submit(fields(1)), writer.submit({'bogus': 'column'}), writer.submit(fields(2))]
+    assert all(p.wait(5) for p in pending)
+    assert [p.error is None for p in pending] == [True, False, True]
+    assert ContactMessage.query.count() == 2
+    assert rollups.rebuild(dry_run=True) == {}
+
+
+def test_close_flushes_the_queue(app, ctx):
+    writer = ingest.WriteBehindQueue(app, batch_size=2, flush_interval=0.5)
+    pending = [writer.submit(fields(i)) for i in range(5)]
+    writer.close()
+    assert all(p.done.is_set() for p in pending)
+    assert ContactMessage.query.count() == 5
+    with pytest.raises(ingest.QueueFull):
+        writer.submit(fields(6))
+
+
+def test_full_queue_is_a_503(app, client, ctx, monkeypatch):
+    writer = ingest.WriteBehindQueue(app, maxsize=1)
+    monkeypatch.setattr(writer, '_ensure_started', lambda: None) # nothing drains the queue
+    monkeypatch.setattr('app.contact_writer', writer)
+    assert client.post('/api/contact', json=fields(1)).status_code == 202
+    res = client.post('/api/contact', json=fields(2))
+    assert res.status_code == 503
+    assert res.json['success'] is False
+
+
+@pytest.mark.parametrize('durable, status, saved', [(False, 202, 'Queued'), (True, 200, 'Saved')])
+def test_wait_durable(writer, client, ctx, monkeypatch, durable, status, saved):
+    monkeypatch.setattr('app.contact_writer', writer)
+    monkeypatch.setattr(ingest, 'WAIT_DURABLE', durable)
+    res = client.post('/api/contact', json=fields(1))
+    assert (res.status_code, res.json['message']) == (status, saved)
+    if durable:
+        assert ContactMessage.query.count() == 1
@@ -0,0 +1,41 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import hashing
+import throttle
+
+USER = {'name': 'A', 'email': 'a@x.com', 'password': 'pw'}
+
+
+@pytest.fixture
+def registered(client, ctx):
+    assert client.post('/api/register', json=USER).json['success']
+
+
+@pytest.fixture
+def checks(monkeypatch):
+    calls = []
+    check = hashing.check_password_hash
+    monkeypatch.setattr(hashing, 'check_password_hash', lambda *args: calls.append(args) or check(*args))
+    return calls
+
+
+def test_unknown_email_costs_a_hash_check(client, registered, checks):
+    assert client.post('/api/login', json=dict(USER, password='wrong')).status_code == 401
+    assert client.post('/api/login', json=dict(USER, email='nobody@x.com')).status_code == 401
+    assert len(checks) == 2
+    assert checks[0][0].split('$')[0] == checks[1][0].split('$')[0] # same method and iterations
+    assert client.post('/api/login', json=USER).json['success']
+
+
+def test_non_object_body_is_a_400(app, client):
+    import main
+    assert client.post('/api/login', json=[]).status_code == 400
+    res = TestClient(main.app).post('/api/login', json=[])
+    assert res.status_code == 400 and res.json()['success'] is False
+
+
+def test_login_is_rate_limited_per_email(client, registered, monkeypatch):
+    monkeypatch.setattr('app.limiter', throttle.Limiter(throttle.MemoryStore(), ip_limit='', email_limit='2/minute'))
+    statuses = [client.post('/api/login', json=USER).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429] # identical logins are not deduplicated, only limited
@@ -0,0 +1,51 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, Response, stream_with_context
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import metrics
+
+
+@pytest.fixture
+def instrumented(monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', True)
+    app = Flask(__name__)
+    engine = create_engine('sqlite://')
+    metrics.init_app(app, SimpleNamespace(engine=engine))
+
+    @app.route('/stream')
+    def stream():
+        def body():
+            for _ in range(2):
+                time.sleep(0.05)
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT 1'))
+                yield 'chunk\n'
+        return Response(stream_with_context(body()))
+    return app, engine
+
+
+def series(histogram, labels):
+    return histogram._series.get(labels)
+
+
+def test_streamed_response_is_timed_until_close(instrumented):
+    app, _ = instrumented
+    res = app.test_client().get('/stream')
+    assert res.get_data() == b'chunk\nchunk\n'
+    res.close()
+    latency = series(metrics.REQUEST_LATENCY, ('/stream', 'GET', 200))
+    assert latency[-1] == 1 and latency[-2] >= 0.1
+    statements = series(metrics.STATEMENTS_PER_REQUEST, ('/stream',))
+    assert statements[-2] == 2
+
+
+def test_failed_statement_does_not_leak_start_time(instrumented):
+    _, engine = instrumented
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM missing_table'))
+        assert not conn.info.get('query_start')
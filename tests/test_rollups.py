@@ -0,0 +1,62 @@
+import threading
+
+import inbox
+import rollups
+from models import db, ContactMessage, RollupCounter
+
+
+def post(client, email, message='hello'):
+    res = client.post('/api/contact', json={'name': 'Test', 'email': email, 'message': message})
+    assert res.status_code == 200, res.json
+
+
+def test_add_and_delete_keep_counters_in_sync(client, ctx):
+    for email in ('a@x.com', 'a@x.com', 'b@x.com', None):
+        post(client, email)
+    total, today, unique = rollups.snapshot()
+    assert (total, today, unique) == (4, 4, 3)
+
+    a_ids = [m.id for m in ContactMessage.query.filter_by(email='a@x.com')]
+    inbox.bulk('delete', ids=a_ids[:1])
+    assert rollups.snapshot()[2] == 3 # a@x.com still has a message
+    inbox.bulk('delete', ids=a_ids[1:])
+    assert rollups.snapshot() == (2, 2, 2)
+    assert rollups.rebuild(dry_run=True) == {}
+
+
+def test_rebuild_repairs_drift(client, ctx):
+    post(client, 'a@x.com')
+    post(client, 'b@x.com')
+    db.session.get(RollupCounter, rollups.TOTAL).value = 99
+    db.session.commit()
+
+    drift = rollups.rebuild()
+    assert drift[rollups.TOTAL] == (99, 2)
+    assert rollups.snapshot() == (2, 2, 2)
+    assert rollups.rebuild(dry_run=True) == {}
+
+
+def test_concurrent_adds_count_a_sender_once(app, ctx):
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def add(i):
+        with app.app_context():
+            try:
+                barrier.wait()
+                msg = ContactMessage(name='Race', email='same@x.com', message=str(i))
+                rollups.messages_added([msg])
+                db.session.add(msg)
+                db.session.commit()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert rollups.snapshot() == (8, 8, 1)
+    assert rollups.rebuild(dry_run=True) == {}
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+import retention
+import search
+from models import db, ContactMessage
+
+
+def add(message, email='a@x.com'):
+    msg = ContactMessage(name='Test', email=email, message=message)
+    db.session.add(msg)
+    db.session.commit()
+    return msg
+
+
+def ids(q, **kwargs):
+    hits, _ = search.search(q, **kwargs)
+    return [m.id for m, _ in hits]
+
+
+def test_triggers_follow_insert_update_and_delete(ctx):
+    msg = add('pricing question')
+    assert ids('pricing') == [msg.id]
+
+    msg.message = 'demo request'
+    db.session.commit()
+    assert ids('pricing') == []
+    assert ids('demo') == [msg.id]
+
+    db.session.delete(msg)
+    db.session.commit()
+    assert ids('demo') == []
+
+
+def test_archived_messages_move_to_the_archive_index(ctx):
+    msg_id = add('invoice missing').id
+    retention.compact(before=datetime.utcnow() + timedelta(seconds=1))
+    assert ids('invoice') == []
+    assert ids('invoice', archive=True) == [msg_id]
+
+
+def test_better_matches_rank_first(ctx):
+    weak = add('a long message that mentions pricing once among many other words')
+    strong = add('pricing pricing pricing')
+    assert ids('pricing') == [strong.id, weak.id]
+
+
+def test_paging_over_equal_ranks_is_stable(ctx):
+    added = [add('same words here').id for _ in range(7)]
+    pages = [ids('same', page=page, limit=3) for page in (1, 2, 3)]
+    assert [i for page in pages for i in page] == sorted(added, reverse=True)
+
+
+def test_backfill_indexes_existing_rows(ctx):
+    msg = add('agency partner')
+    db.session.execute(text("INSERT INTO contact_message_fts(contact_message_fts) VALUES ('delete-all')"))
+    db.session.commit()
+    assert ids('agency') == []
+    search.backfill()
+    assert ids('agency') == [msg.id]
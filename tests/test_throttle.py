@@ -0,0 +1,142 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import throttle
+
+
+def contact(i):
+    return {'name': 'Test', 'email': f'u{i}@x.com', 'message': f'm{i}'}
+
+
+def test_client_ip_trusts_only_the_proxies_hops():
+    spoofed = '6.6.6.6, 203.0.113.9'
+    assert throttle.client_ip('10.0.0.1', spoofed, trusted=1) == '203.0.113.9'
+    assert throttle.client_ip('10.0.0.1', spoofed, trusted=2) == '6.6.6.6'
+    assert throttle.client_ip('10.0.0.1', spoofed, trusted=0) == '10.0.0.1'
+    assert throttle.client_ip('10.0.0.1', None, trusted=1) == '10.0.0.1'
+    assert throttle.client_ip('10.0.0.1', '203.0.113.9', trusted=2) == '10.0.0.1' # fewer hops than proxies
+
+
+@pytest.fixture
+def one_per_ip(monkeypatch):
+    monkeypatch.setattr(throttle, 'TRUSTED_PROXIES', 1)
+    return throttle.Limiter(throttle.MemoryStore(), ip_limit='1/minute', email_limit='', dedupe_ttl=0)
+
+
+@pytest.mark.parametrize('entry', ['flask', 'asgi'])
+def test_spoofed_forwarded_for_does_not_change_the_bucket(app, ctx, monkeypatch, one_per_ip, entry):
+    if entry == 'flask':
+        monkeypatch.setattr('app.limiter', one_per_ip)
+        client = app.test_client()
+    else:
+        import main
+        monkeypatch.setattr(main, 'limiter', one_per_ip)
+        client = TestClient(main.app)
+
+    def post(i, forwarded_for):
+        return client.post('/api/contact', json=contact(i), headers={'X-Forwarded-For': forwarded_for}).status_code
+
+    assert post(1, '6.6.6.6, 203.0.113.9') == 200
+    assert post(2, '7.7.7.7, 203.0.113.9') == 429 # same client behind the proxy
+    assert post(3, '203.0.113.10') == 200
+
+
+class Clock:
+    """Stands in for the time module inside throttle."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(throttle, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path, clock):
+    if request.param == 'memory':
+        return throttle.MemoryStore()
+    return throttle.SQLiteStore(str(tmp_path / 'limits.db'))
+
+
+def test_parse_limit():
+    assert throttle.parse_limit('20/minute') == (20, 20 / 60)
+    assert throttle.parse_limit('') is None and throttle.parse_limit('0/hour') is None
+    with pytest.raises(ValueError):
+        throttle.parse_limit('20/fortnight')
+
+
+def test_bucket_refills_over_time(store, clock):
+    limiter = throttle.Limiter(store, ip_limit='2/minute', email_limit='', dedupe_ttl=0)
+    limiter.check('contact', '1.2.3.4', contact(1))
+    limiter.check('contact', '1.2.3.4', contact(2))
+    with pytest.raises(throttle.Limited) as limited:
+        limiter.check('contact', '1.2.3.4', contact(3))
+    assert limited.value.retry_after == pytest.approx(30)
+    limiter.check('contact', '5.6.7.8', contact(3)) # other clients have their own bucket
+    clock.now += 30
+    limiter.check('contact', '1.2.3.4', contact(3))
+
+
+def test_email_limit_spans_addresses(store):
+    limiter = throttle.Limiter(store, ip_limit='', email_limit='1/minute', dedupe_ttl=0)
+    limiter.check('contact', '1.1.1.1', dict(contact(1), email='Same@x.com '))
+    with pytest.raises(throttle.Limited):
+        limiter.check('contact', '2.2.2.2', dict(contact(2), email='same@x.com'))
+
+
+def test_duplicates_are_dropped_until_the_ttl_passes(store, clock):
+    limiter = throttle.Limiter(store, ip_limit='', email_limit='', dedupe_ttl=600)
+    limiter.check('contact', '1.2.3.4', contact(1))
+    with pytest.raises(throttle.Duplicate):
+        limiter.check('contact', '1.2.3.4', dict(contact(1), message=' M1 ')) # normalized
+    limiter.check('register', '1.2.3.4', contact(1)) # per endpoint
+    clock.now += 601
+    limiter.check('contact', '1.2.3.4', contact(1))
+
+
+def test_failed_write_can_be_retried(store):
+    limiter = throttle.Limiter(store, ip_limit='', email_limit='', dedupe_ttl=600)
+    key = limiter.check('contact', '1.2.3.4', contact(1))
+    limiter.failed(key)
+    assert limiter.check('contact', '1.2.3.4', contact(1)) == key
+
+
+def test_sqlite_store_is_shared_between_processes(tmp_path, clock):
+    path = str(tmp_path / 'limits.db')
+    first, second = (throttle.Limiter(throttle.SQLiteStore(path), ip_limit='1/minute', email_limit='')
+                     for _ in range(2))
+    first.check('contact', '1.2.3.4', contact(1))
+    with pytest.raises(throttle.Limited):
+        second.check('contact', '1.2.3.4', contact(2))
+    with pytest.raises(throttle.Duplicate):
+        second.check('contact', '5.6.7.8', contact(1))
+
+
+def test_memory_store_forgets_the_oldest_keys(clock):
+    limiter = throttle.Limiter(throttle.MemoryStore(max_keys=2), ip_limit='1/minute', email_limit='', dedupe_ttl=0)
+    for ip in ('1.1.1.1', '2.2.2.2', '3.3.3.3'):
+        limiter.check('contact', ip, contact(1))
+    limiter.check('contact', '1.1.1.1', contact(1)) # evicted: more lenient, never stricter
+    with pytest.raises(throttle.Limited):
+        limiter.check('contact', '3.3.3.3', contact(1))
+
+
+def test_routes_answer_429_with_retry_after_and_drop_duplicates(client, ctx, monkeypatch):
+    limiter = throttle.Limiter(throttle.MemoryStore(), ip_limit='2/minute', email_limit='')
+    monkeypatch.setattr('app.limiter', limiter)
+    assert client.post('/api/contact', json=contact(1)).json['message'] == 'Saved'
+    res = client.post('/api/contact', json=contact(1))
+    assert (res.status_code, res.json['message']) == (200, 'Already received')
+    res = client.post('/api/contact', json=contact(2))
+    assert res.status_code == 429
+    assert res.headers['Retry-After'] == '30'
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import billing
+import rollups
+import timeseries
+from models import db, ContactMessage, User
+
+
+def add_message(when, email='a@x.com'):
+    msg = ContactMessage(name='Test', email=email, message='hello', date=when)
+    rollups.messages_added([msg])
+    db.session.add(msg)
+    db.session.commit()
+
+
+def totals(points, field):
+    return {p['start']: p[field] for p in points if p[field]}
+
+
+def test_day_and_week_buckets_come_from_the_counters(ctx):
+    base = datetime(2024, 3, 4, 12) # a Monday
+    for offset in (0, 0, 1, 7, 9):
+        add_message(base + timedelta(days=offset, hours=offset))
+    billing.create_user('Ann', 'ann@x.com', 'hash')
+    signup_day = db.session.query(User.created_at).scalar()
+
+    start, end = datetime(2024, 3, 1), datetime(2024, 3, 20)
+    for bucket in ('day', 'week'):
+        expected = timeseries.counts(ContactMessage.date, bucket, start, end)
+        assert totals(timeseries.series(bucket, start, end), 'submissions') == expected
+    assert totals(timeseries.series('week', start, end), 'submissions') == {'2024-03-04': 3, '2024-03-11': 2}
+
+    day = signup_day.replace(hour=0, minute=0, second=0, microsecond=0)
+    points = timeseries.series('day', day - timedelta(days=2), day + timedelta(days=1))
+    assert totals(points, 'signups') == {day.date().isoformat(): 1}
+    assert rollups.rebuild(dry_run=True) == {}
+
+
+def test_hour_buckets_still_group_the_rows(ctx):
+    add_message(datetime(2024, 3, 4, 9, 15))
+    add_message(datetime(2024, 3, 4, 9, 45))
+    add_message(datetime(2024, 3, 4, 11))
+    points = timeseries.series('hour', datetime(2024, 3, 4, 8), datetime(2024, 3, 4, 12))
+    assert totals(points, 'submissions') == {'2024-03-04T09:00:00': 2, '2024-03-04T11:00:00': 1}
+
+
+def test_partial_days_only_count_rows_inside_the_range(ctx):
+    for when in (datetime(2024, 3, 4, 9), datetime(2024, 3, 4, 15), datetime(2024, 3, 5, 10),
+                 datetime(2024, 3, 6, 8), datetime(2024, 3, 6, 20)):
+        add_message(when)
+    ranges = [(datetime(2024, 3, 4, 12), datetime(2024, 3, 6, 12)), # both edges partial
+              (datetime(2024, 3, 4, 12), datetime(2024, 3, 4, 18)), # inside one day
+              (datetime(2024, 3, 4), datetime(2024, 3, 6, 12))]
+    for start, end in ranges:
+        hourly = sum(p['submissions'] for p in timeseries.series('hour', start, end))
+        for bucket in ('day', 'week'):
+            assert sum(p['submissions'] for p in timeseries.series(bucket, start, end)) == hourly, (start, end, bucket)
+    assert totals(timeseries.series('day', *ranges[0]), 'submissions') == {'2024-03-04': 1, '2024-03-05': 1, '2024-03-06': 1}
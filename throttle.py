@@ -0,0 +1,254 @@
+"""Rate limiting and duplicate suppression for the public write endpoints.
+
+Off unless RATE_LIMIT_ENABLED=1: keyed by client IP, it needs the proxy setup
+below first, or every visitor shares the proxy's address and one bucket.
+render.yaml enables it together with TRUSTED_PROXIES=1.
+
+When enabled, every POST to /api/contact, /api/register and /api/login goes
+through check() before it touches the database or the hashing pool (login
+gets the rate limits only, no duplicate suppression):
+
+1. Token buckets keyed by client IP and by submitted email
+   (RATE_LIMIT_IP, RATE_LIMIT_EMAIL, e.g. "20/minute"; empty disables).
+   An empty bucket is a 429 with Retry-After.
+2. A content hash of the submission is remembered for DEDUPE_TTL seconds;
+   an identical resubmission inside that window is dropped.
+
+Both are O(1) per request. State lives in a pluggable store
+(RATE_LIMIT_STORE):
+- memory            per process, LRU-bounded to RATE_LIMIT_MAX_KEYS keys per
+                    table (the default)
+- sqlite:///path    a SQLite file shared by every worker on the host
+                    (e.g. sqlite:////dev/shm/aimatrix-limits.db)
+- module:attr       any callable returning an object with take/seen/forget
+
+Evicting a key only ever forgets state, so the memory bound can make the
+limiter more lenient, never stricter.
+
+Behind proxies set TRUSTED_PROXIES to how many there are (both entry points
+read it, see client_ip()). Each proxy appends the address it saw to
+X-Forwarded-For, so only that many entries from the right can be trusted;
+anything further left was sent by the client and would let it pick a fresh
+bucket per request. Do not use uvicorn's FORWARDED_ALLOW_IPS='*' for this: it
+trusts the left-most entry.
+"""
+import hashlib
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '0') == '1'
+IP_LIMIT = os.environ.get('RATE_LIMIT_IP', '20/minute')
+EMAIL_LIMIT = os.environ.get('RATE_LIMIT_EMAIL', '5/minute')
+DEDUPE_TTL = float(os.environ.get('DEDUPE_TTL', 600))
+MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))
+STORE = os.environ.get('RATE_LIMIT_STORE', 'memory')
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+
+# Endpoint -> fields that identify a duplicate submission (never the password);
+# endpoints not listed are rate limited only
+DEDUPE_FIELDS = {
+    'contact': ('name', 'email', 'message'),
+    'register': ('name', 'email', 'company'),
+}
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+class Limited(Exception):
+    """The request is over a rate limit; retry_after is in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Duplicate(Exception):
+    pass
+
+
+def parse_limit(spec):
+    """'20/minute' -> (capacity 20, refill 20/60 tokens per second); None if disabled."""
+    if not spec:
+        return None
+    count, _, period = spec.partition('/')
+    if period not in PERIODS:
+        raise ValueError(f"Invalid rate limit {spec!r}, expected e.g. '20/minute'")
+    count = int(count)
+    return (count, count / PERIODS[period]) if count > 0 else None
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryStore:
+    """Process-local store, each table an LRU capped at `max_keys` entries."""
+
+    def __init__(self, max_keys=MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict() # key -> (tokens, updated)
+        self._seen = OrderedDict() # key -> expires
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """Take one token; returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = _refill(tokens, updated, now, capacity, rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def seen(self, key, ttl):
+        """True if `key` was recorded in the last `ttl` seconds; records it otherwise."""
+        now = time.monotonic()
+        with self._lock:
+            expires = self._seen.get(key)
+            if expires is not None and expires > now:
+                return True
+            self._seen.pop(key, None)
+            self._seen[key] = now + ttl
+            # Same TTL for every key, so the oldest entries expire first
+            while self._seen and (len(self._seen) > self.max_keys or next(iter(self._seen.values())) <= now):
+                self._seen.popitem(last=False)
+        return False
+
+    def forget(self, key):
+        with self._lock:
+            self._seen.pop(key, None)
+
+
+class SQLiteStore:
+    """Store in a local SQLite file, shared by all worker processes on the host.
+
+    Each check is one short IMMEDIATE transaction on a primary-key row. Rows
+    that no longer carry state (full buckets, expired hashes) are pruned every
+    `prune_every` operations, which keeps the file bounded by recent traffic.
+    """
+
+    def __init__(self, path, prune_every=1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._ops = 0
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL, updated REAL, idle REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, expires REAL)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF") # losing limiter state on a crash is fine
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _transaction(self, work):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn, time.time())
+            self._ops += 1
+            if self._ops % self.prune_every == 0:
+                self._prune(conn, time.time())
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _prune(self, conn, now):
+        conn.execute("DELETE FROM bucket WHERE idle < ?", (now,))
+        conn.execute("DELETE FROM seen WHERE expires <= ?", (now,))
+
+    def take(self, key, capacity, rate):
+        def work(conn, now):
+            row = conn.execute("SELECT tokens, updated FROM bucket WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(*(row or (capacity, now)), now, capacity, rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            tokens = tokens - 1 if not wait else tokens
+            # `idle`: when the bucket will be full again and the row can go
+            conn.execute("INSERT OR REPLACE INTO bucket VALUES (?, ?, ?, ?)",
+                         (key, tokens, now, now + (capacity - tokens) / rate))
+            return wait
+        return self._transaction(work)
+
+    def seen(self, key, ttl):
+        def work(conn, now):
+            row = conn.execute("SELECT expires FROM seen WHERE key = ?", (key,)).fetchone()
+            if row and row[0] > now:
+                return True
+            conn.execute("INSERT OR REPLACE INTO seen VALUES (?, ?)", (key, now + ttl))
+            return False
+        return self._transaction(work)
+
+    def forget(self, key):
+        self._connect().execute("DELETE FROM seen WHERE key = ?", (key,))
+
+
+def load_store(spec=STORE):
+    if spec == 'memory':
+        return MemoryStore()
+    if spec.startswith('sqlite:///'):
+        return SQLiteStore(spec[len('sqlite:///'):])
+    module, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module), attr)()
+
+
+def client_ip(peer, forwarded_for=None, trusted=None):
+    """Address to rate limit by: the `trusted`-th X-Forwarded-For entry from
+    the right (default TRUSTED_PROXIES), else the connecting peer."""
+    trusted = TRUSTED_PROXIES if trusted is None else trusted
+    if trusted and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if len(hops) >= trusted:
+            return hops[-trusted]
+    return peer
+
+
+def fingerprint(endpoint, data):
+    """Content hash of the identifying fields of a submission."""
+    fields = [str(data.get(f) or '').strip().lower() for f in DEDUPE_FIELDS[endpoint]]
+    return endpoint + ':' + hashlib.blake2b(json.dumps(fields).encode(), digest_size=16).hexdigest()
+
+
+class Limiter:
+    def __init__(self, store=None, ip_limit=IP_LIMIT, email_limit=EMAIL_LIMIT, dedupe_ttl=DEDUPE_TTL):
+        self.store = store if store is not None else load_store()
+        self.ip_limit = parse_limit(ip_limit)
+        self.email_limit = parse_limit(email_limit)
+        self.dedupe_ttl = dedupe_ttl
+
+    def _take(self, key, limit):
+        if limit:
+            wait = self.store.take(key, *limit)
+            if wait:
+                raise Limited("Too many requests, please slow down", wait)
+
+    def check(self, endpoint, ip, data):
+        """Admit one write. Raises Limited or Duplicate; returns the
+        submission's fingerprint (pass it to failed() if the write fails),
+        None for endpoints without duplicate suppression."""
+        self._take(f'{endpoint}:ip:{ip}', self.ip_limit)
+        email = str(data.get('email') or '').strip().lower()
+        if email:
+            self._take(f'{endpoint}:email:{email}', self.email_limit)
+        if endpoint not in DEDUPE_FIELDS:
+            return None
+        key = fingerprint(endpoint, data)
+        if self.dedupe_ttl > 0 and self.store.seen(key, self.dedupe_ttl):
+            raise Duplicate("Duplicate submission")
+        return key
+
+    def failed(self, key):
+        """Let a submission through again after its write failed."""
+        self.store.forget(key)
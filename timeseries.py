@@ -0,0 +1,125 @@
+"""Time-bucketed submission and signup counts for /api/analytics/timeseries.
+
+Whole UTC days of day and week buckets are summed from the per-day rollup
+counters (messages.day:*, users.day:*, see rollups.py): one primary-key range
+scan of at most one row per day, however many messages there are. Archived
+messages are in the counters already.
+
+Hour buckets, and the partial days at either edge of a range that does not
+start and end at midnight, are counted in SQL with one GROUP BY per table
+over the indexed date column: strftime()/date() on SQLite, date_trunc() on
+Postgres. The range predicate and the bucket expression only need that
+column, so the database answers from the index without touching table rows.
+The archive table (see retention.py) is always counted too: it has the same
+date index, so a range with nothing archived costs one empty index probe,
+and rows archived early (compact-messages --days, or a later change of
+RETENTION_DAYS) are never missed. Every bucket size therefore counts exactly
+the rows inside [start, end).
+
+Python only zero-fills empty buckets so charts get a continuous series.
+Weeks start on Monday.
+"""
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import func
+
+import rollups
+from models import db, ContactMessage, ArchivedMessage, User
+
+BUCKETS = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}
+DEFAULT_RANGE = timedelta(days=30)
+MAX_BUCKETS = 10000
+
+
+def _bucket_expr(column, bucket, dialect):
+    if dialect == 'sqlite':
+        if bucket == 'hour':
+            # SQLAlchemy stores SQLite datetimes as 'YYYY-MM-DD HH:MM:SS...' text;
+            # slicing it is twice as fast as strftime() (see _key for the format)
+            return func.substr(column, 1, 13)
+        if bucket == 'day':
+            return func.date(column)
+        return func.date(column, 'weekday 0', '-6 days') # Monday of that week
+    if dialect == 'postgresql':
+        return func.date_trunc(bucket, column)
+    raise ValueError(f"Time buckets are not supported on {dialect}")
+
+
+def _key(value, bucket):
+    """Normalize a bucket value from either backend to an ISO string."""
+    if isinstance(value, datetime):
+        return value.isoformat() if bucket == 'hour' else value.date().isoformat()
+    if bucket == 'hour':
+        return value.replace(' ', 'T') + ':00:00'
+    return value
+
+
+def _truncate(moment, bucket):
+    if bucket == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday()) if bucket == 'week' else day
+
+
+def counts(column, bucket, start, end):
+    dialect = db.session.get_bind().dialect.name
+    expr = _bucket_expr(column, bucket, dialect)
+    rows = db.session.query(expr, func.count()).filter(column >= start, column < end).group_by(expr)
+    return {_key(value, bucket): count for value, count in rows}
+
+
+def _merge(into, more):
+    for key, count in more.items():
+        into[key] = into.get(key, 0) + count
+    return into
+
+
+def grouped(bucket, start, end):
+    """(submissions, signups) in [start, end), grouped over the raw tables."""
+    submissions = _merge(counts(ContactMessage.date, bucket, start, end),
+                         counts(ArchivedMessage.date, bucket, start, end))
+    return submissions, counts(User.created_at, bucket, start, end)
+
+
+def rollup_counts(prefix, bucket, first, last):
+    """Like counts(), summed from the per-day counters for the days in [first, last)."""
+    result = {}
+    for day, count in rollups.day_counts(prefix, first, last).items():
+        key = _key(_truncate(datetime.combine(day, time.min), bucket), bucket)
+        result[key] = result.get(key, 0) + count
+    return result
+
+
+def series(bucket='day', start=None, end=None):
+    """Return [{start, submissions, signups}, ...] covering [start, end)."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    end = end or datetime.utcnow()
+    start = start or end - DEFAULT_RANGE
+    if start >= end:
+        raise ValueError("'from' must be before 'to'")
+    if (end - start) / BUCKETS[bucket] > MAX_BUCKETS:
+        raise ValueError(f"Range too large for {bucket} buckets (max {MAX_BUCKETS})")
+
+    submissions, signups, rows = {}, {}, [(start, end)]
+    if bucket != 'hour':
+        # Whole days from the counters; only partial edge days need the rows
+        first = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+        last = end.date()
+        if first < last:
+            submissions = rollup_counts(rollups.DAY_PREFIX, bucket, first, last)
+            signups = rollup_counts(rollups.SIGNUP_DAY_PREFIX, bucket, first, last)
+            rows = [(start, datetime.combine(first, time.min)), (datetime.combine(last, time.min), end)]
+    for lo, hi in rows:
+        if lo < hi:
+            more_submissions, more_signups = grouped(bucket, lo, hi)
+            _merge(submissions, more_submissions)
+            _merge(signups, more_signups)
+
+    points = []
+    moment = _truncate(start, bucket)
+    while moment < end:
+        key = _key(moment, bucket)
+        points.append({"start": key, "submissions": submissions.get(key, 0), "signups": signups.get(key, 0)})
+        moment += BUCKETS[bucket]
+    return points